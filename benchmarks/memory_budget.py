@@ -0,0 +1,79 @@
+"""加解密峰值内存检查
+
+用法:
+    python benchmarks/memory_budget.py --size-mb 256
+
+用tracemalloc测量加密包加密/解密的Python堆峰值，峰值超过“若干分段大小 + 固定余量”时
+以退出码1结束，可直接放进CI。峰值与文件大小无关，多线程时每个在途分段各占一个缓冲区，预算按线程数放大。
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crypto_engine import SEGMENT_SIZE, encrypt_package, decrypt_package, generate_keypair, import_key
+
+MiB = 1024 * 1024
+# 读缓冲区 + 分段缓冲区之外允许的余量（ZIP簿记、密码对象、解释器自身的零散分配）
+OVERHEAD = 1.5 * MiB
+
+
+def measure(func, *args, **kwargs):
+    """返回(峰值字节, 秒数)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1], time.perf_counter() - start
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="加解密峰值内存检查")
+    parser.add_argument("--size-mb", type=int, default=64, help="测试文件大小(MB)")
+    parser.add_argument("--workers", type=int, default=1, help="分段加解密线程数")
+    args = parser.parse_args()
+
+    private_pem, public_pem = generate_keypair()
+    public_key, private_key = import_key(public_pem), import_key(private_pem)
+    # 编码器最多同时持有 2 * workers + 1 个分段，另有一个读缓冲区
+    budget = (2 * args.workers + 2) * SEGMENT_SIZE + OVERHEAD
+
+    work_dir = tempfile.mkdtemp(prefix="epkg-membench-")
+    failed = False
+    try:
+        src = os.path.join(work_dir, "payload.bin")
+        with open(src, 'wb') as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(MiB))
+        out = os.path.join(work_dir, "payload.epkg")
+        extract_dir = os.path.join(work_dir, "extracted")
+        os.mkdir(extract_dir)
+
+        cases = [
+            ("加密包加密(不压缩)", encrypt_package, ([src], [public_key], out, 'stored'),
+             {'crypto_workers': args.workers, 'compress_workers': 1}),
+            ("加密包解密", decrypt_package, (out, private_key, extract_dir), {'workers': args.workers}),
+            ("加密包加密(deflate)", encrypt_package, ([src], [public_key], out, 'deflate', 1),
+             {'crypto_workers': args.workers, 'compress_workers': 1}),
+        ]
+        print(f"数据大小: {args.size_mb} MB, 线程数: {args.workers}, 预算: {budget / MiB:.2f} MiB")
+        print(f"{'场景':<20} {'峰值MiB':>8} {'MB/s':>8}  结果")
+        for name, func, func_args, kwargs in cases:
+            peak, seconds = measure(func, *func_args, **kwargs)
+            ok = peak <= budget
+            failed |= not ok
+            print(f"{name:<20} {peak / MiB:>8.2f} {args.size_mb / seconds:>8.1f}  {'✅' if ok else '❌ 超出预算'}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
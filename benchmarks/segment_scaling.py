@@ -0,0 +1,76 @@
+"""分段加解密并行扩展性基准测试
+
+用法:
+    python benchmarks/segment_scaling.py --size-mb 1024 --workers 1,2,4,8,16,32
+
+对同一份随机数据分别用不同线程数做分段加密和顺序解密，输出吞吐量和相对单线程的加速比。
+"""
+import argparse
+import os
+import secrets
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crypto_engine import (SegmentWriter, SegmentReader, write_epkg_header, read_epkg_header,
+                           AES_KEY_SIZE, NONCE_PREFIX_SIZE, SEGMENT_SIZE, SLOT_RSA_OAEP, KEY_ID_SIZE)
+
+
+def run_once(path, payload_mb, workers):
+    """返回(加密秒数, 解密秒数)"""
+    aes_key = secrets.token_bytes(AES_KEY_SIZE)
+    nonce_prefix = secrets.token_bytes(NONCE_PREFIX_SIZE)
+    chunk = os.urandom(SEGMENT_SIZE)
+
+    start = time.perf_counter()
+    with open(path, 'wb') as f:
+        aad = write_epkg_header(f, nonce_prefix, [(SLOT_RSA_OAEP, bytes(KEY_ID_SIZE), b"\x00" * 256)])
+        writer = SegmentWriter(f, aes_key, nonce_prefix, aad, workers=workers)
+        for _ in range(payload_mb):
+            writer.write(chunk)
+        writer.close()
+    encrypt_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        header = read_epkg_header(f)
+        body_length = os.path.getsize(path) - header['body_offset']
+        reader = SegmentReader(f, header, aes_key, body_length, workers=workers)
+        try:
+            while reader.read(SEGMENT_SIZE):
+                pass
+        finally:
+            reader.close()
+    decrypt_seconds = time.perf_counter() - start
+    return encrypt_seconds, decrypt_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分段加解密并行扩展性基准测试")
+    parser.add_argument("--size-mb", type=int, default=512, help="测试数据大小(MB)")
+    parser.add_argument("--workers", default="1,2,4,8", help="逗号分隔的线程数列表")
+    args = parser.parse_args()
+
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    fd, path = tempfile.mkstemp(suffix=".epkg")
+    os.close(fd)
+    try:
+        print(f"数据大小: {args.size_mb} MB, CPU核数: {os.cpu_count()}")
+        print(f"{'线程数':>6} {'加密MB/s':>10} {'加速比':>8} {'解密MB/s':>10} {'加速比':>8}")
+        baseline = None
+        for workers in worker_counts:
+            encrypt_seconds, decrypt_seconds = run_once(path, args.size_mb, workers)
+            encrypt_rate = args.size_mb / encrypt_seconds
+            decrypt_rate = args.size_mb / decrypt_seconds
+            if baseline is None:
+                baseline = (encrypt_rate, decrypt_rate)
+            print(f"{workers:>6} {encrypt_rate:>10.1f} {encrypt_rate / baseline[0]:>8.2f}"
+                  f" {decrypt_rate:>10.1f} {decrypt_rate / baseline[1]:>8.2f}")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
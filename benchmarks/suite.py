@@ -0,0 +1,428 @@
+"""加解密与打包性能基准套件
+
+用法:
+    python benchmarks/suite.py -o results.json                        # 快速档，结果写入JSON
+    python benchmarks/suite.py --profile full -o results.json         # 完整档（最大4GB、10000个文件，需要约12GB磁盘）
+    python benchmarks/suite.py --baseline baseline.json -o new.json   # 与基线比较，有退化时退出码为1
+    python benchmarks/suite.py --filter "package.*" --repeat 10
+
+覆盖 encrypt_message / decrypt_message（不同消息大小和接收方数量）、generate_keypair，
+以及 encrypt_package / decrypt_package（不同总大小、文件数量，可压缩文本与随机数据）。
+测试数据、接收方密钥和待解密的加密包由主进程预先生成（随机种子固定，可复现），
+每个用例在单独的子进程中运行，峰值常驻内存(RSS)只包含该用例本身。
+每个用例先预热，再重复执行到至少 --repeat 次且累计至少 --min-time 秒，报告延迟百分位、吞吐量和峰值RSS。
+
+与基线比较时，中位延迟或峰值RSS超过基线的 (1 + --threshold) 倍即视为退化。
+基线应来自同一台机器，用任意一次运行的输出JSON即可。
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import crypto_engine
+from crypto_engine import (COMPRESS_WORKERS, CRYPTO_WORKERS, RSA_KEY_BITS, decrypt_message, decrypt_package,
+                           encrypt_message, encrypt_package, generate_keypair)
+
+KB = 1024
+MB = 1024 * KB
+GB = 1024 * MB
+SEED = 20240601
+# 单个用例最多重复的次数，避免极快的用例在 --min-time 内跑上万次
+MAX_REPEAT = 200
+
+PROFILES = {
+    'quick': {
+        'message_sizes': [1 * KB, 64 * KB, 1 * MB],
+        'recipients': [1, 10],
+        'key_types': [('RSA', RSA_KEY_BITS, None), ('ECC', RSA_KEY_BITS, 'P-256')],
+        # (总大小, 文件数, 数据类型)
+        'packages': [(1 * MB, 1, 'random'), (16 * MB, 1, 'random'), (16 * MB, 1, 'text'),
+                     (16 * MB, 100, 'text'), (4 * MB, 1000, 'text')],
+    },
+    'full': {
+        'message_sizes': [1 * KB, 64 * KB, 1 * MB, 10 * MB],
+        'recipients': [1, 10, 100],
+        'key_types': [('RSA', 2048, None), ('RSA', 3072, None), ('RSA', 4096, None),
+                      ('ECC', RSA_KEY_BITS, 'P-256'), ('ECC', RSA_KEY_BITS, 'P-384')],
+        'packages': [(1 * MB, 1, 'random'), (1 * MB, 1, 'text'),
+                     (64 * MB, 1, 'random'), (64 * MB, 1, 'text'), (64 * MB, 1000, 'text'),
+                     (1 * GB, 1, 'random'), (1 * GB, 1, 'text'),
+                     (256 * MB, 10000, 'random'), (256 * MB, 10000, 'text'),
+                     (4 * GB, 1, 'random'), (4 * GB, 1, 'text')],
+    },
+}
+
+
+def format_size(size):
+    for unit, factor in (('GB', GB), ('MB', MB), ('KB', KB)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return f"{size}B"
+
+
+# ===== 测试数据 =====
+
+def _text_blocks(rng, count=8, size=MB):
+    """生成若干块类似日志/CSV的可压缩文本，大文件由这些块随机拼接"""
+    events = ['login', 'logout', 'upload', 'download', 'share', 'delete']
+    blocks = []
+    for _ in range(count):
+        lines = []
+        length = 0
+        while length < size:
+            line = (f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:"
+                    f"{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d},user{rng.randint(0, 99999):05d},"
+                    f"{rng.choice(events)},{rng.randint(0, 1000000)}\n")
+            lines.append(line)
+            length += len(line)
+        blocks.append("".join(lines).encode()[:size])
+    return blocks
+
+
+def write_data_file(path, size, kind, rng, text_blocks):
+    with open(path, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            n = min(remaining, MB)
+            f.write(rng.randbytes(n) if kind == 'random' else rng.choice(text_blocks)[:n])
+            remaining -= n
+
+
+def make_message(size, kind='text'):
+    rng = random.Random(SEED + size)
+    if kind == 'random':
+        return rng.randbytes(size)
+    blocks = _text_blocks(rng, count=1, size=min(size, MB))
+    return (blocks[0] * (size // len(blocks[0]) + 1))[:size]
+
+
+# ===== 用例 =====
+
+def plan_cases(profile):
+    """返回用例列表，每个用例是可JSON序列化的字典，id唯一"""
+    cases = []
+    for size in profile['message_sizes']:
+        for recipients in profile['recipients']:
+            cases.append({'id': f"message.encrypt/size={format_size(size)}/recipients={recipients}",
+                          'kind': 'message.encrypt', 'size': size, 'recipients': recipients})
+        cases.append({'id': f"message.decrypt/size={format_size(size)}",
+                      'kind': 'message.decrypt', 'size': size})
+    for _, bits, curve in profile['key_types']:
+        name = f"RSA-{bits}" if curve is None else f"ECC-{curve}"
+        cases.append({'id': f"keygen/{name}", 'kind': 'keygen', 'bits': bits, 'curve': curve})
+    for size, files, data in profile['packages']:
+        dataset = f"size={format_size(size)}/files={files}/data={data}"
+        for kind in ('package.encrypt', 'package.decrypt'):
+            cases.append({'id': f"{kind}/{dataset}", 'kind': kind, 'size': size, 'files': files,
+                          'data': data, 'dataset': dataset.replace('/', '_').replace('=', '-')})
+    return cases
+
+
+def prepare(cases, work_dir, log):
+    """在主进程中生成所有用例共用的密钥、数据文件和待解密的加密包"""
+    max_recipients = max([case.get('recipients', 1) for case in cases] + [1])
+    log(f"生成 {max_recipients} 个接收方密钥对...")
+    keys = [generate_keypair() for _ in range(max_recipients)]
+    with open(os.path.join(work_dir, "keys.json"), 'w') as f:
+        json.dump(keys, f)
+
+    rng = random.Random(SEED)
+    text_blocks = _text_blocks(rng)
+    for case in cases:
+        if not case['kind'].startswith('package.'):
+            continue
+        data_dir = os.path.join(work_dir, case['dataset'])
+        if not os.path.isdir(data_dir):
+            log(f"生成测试数据 {case['dataset']}...")
+            os.mkdir(data_dir)
+            file_size = max(1, case['size'] // case['files'])
+            for i in range(case['files']):
+                write_data_file(os.path.join(data_dir, f"f{i:05d}.bin"), file_size, case['data'], rng, text_blocks)
+        package_path = data_dir + ".epkg"
+        if case['kind'] == 'package.decrypt' and not os.path.exists(package_path):
+            encrypt_package(_data_files(data_dir), [keys[0][1]], package_path)
+
+
+def _data_files(data_dir):
+    return [os.path.join(data_dir, name) for name in sorted(os.listdir(data_dir))]
+
+
+def setup_case(case, work_dir):
+    """在子进程中做不计时的准备，返回(计时的操作, 每次操作后的清理, 每次操作处理的字节数)"""
+    with open(os.path.join(work_dir, "keys.json")) as f:
+        keys = json.load(f)
+    kind = case['kind']
+    if kind == 'message.encrypt':
+        message = make_message(case['size'])
+        public_keys = [public for _, public in keys[:case['recipients']]]
+        return (lambda: [encrypt_message(message, public) for public in public_keys],
+                None, case['size'] * case['recipients'])
+    if kind == 'message.decrypt':
+        token = encrypt_message(make_message(case['size']), keys[0][1])
+        private = keys[0][0]
+        return lambda: decrypt_message(token, private), None, case['size']
+    if kind == 'keygen':
+        return lambda: generate_keypair(case['bits'], case['curve']), None, None
+
+    data_dir = os.path.join(work_dir, case['dataset'])
+    out_path = os.path.join(work_dir, f"out-{os.getpid()}")
+    if kind == 'package.encrypt':
+        files = _data_files(data_dir)
+        return (lambda: encrypt_package(files, [keys[0][1]], out_path),
+                lambda: os.unlink(out_path), case['size'])
+    if kind == 'package.decrypt':
+        package_path = data_dir + ".epkg"
+        private = keys[0][0]
+
+        def run():
+            os.mkdir(out_path)
+            decrypt_package(package_path, private, out_path)
+        return run, lambda: shutil.rmtree(out_path), case['size']
+    raise ValueError(f"未知的用例类型: {kind}")
+
+
+# ===== 测量 =====
+
+def peak_rss():
+    """(本进程峰值RSS, 子进程中最大的峰值RSS)，单位字节；取不到时为None"""
+    try:
+        import resource
+    except ImportError:
+        return _windows_peak_rss(), None
+    # Linux上ru_maxrss单位为KB，macOS上为字节
+    scale = 1 if sys.platform == 'darwin' else KB
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+
+
+def _windows_peak_rss():
+    try:
+        import ctypes
+        from ctypes import wintypes
+    except ImportError:
+        return None
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+    kernel32 = ctypes.windll.kernel32
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    kernel32.K32GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters),
+                                                 wintypes.DWORD]
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    if not kernel32.K32GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+        return None
+    return counters.PeakWorkingSetSize
+
+
+def run_child(case, work_dir, repeat, min_time, warmup):
+    """子进程入口：准备、预热并计时，返回原始测量结果"""
+    base_rss, inherited_worker_rss = peak_rss()
+    operation, cleanup, nbytes = setup_case(case, work_dir)
+    for _ in range(warmup):
+        operation()
+        if cleanup:
+            cleanup()
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < MAX_REPEAT and (len(latencies) < repeat or time.perf_counter() - start < min_time):
+        t0 = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - t0)
+        if cleanup:
+            cleanup()
+    rss, worker_rss = peak_rss()
+    # 子进程的峰值在fork时可能继承自父进程，只有在本用例中增长了才算作压缩工作进程的峰值
+    if worker_rss is not None and worker_rss <= (inherited_worker_rss or 0):
+        worker_rss = None
+    return {'latencies': latencies, 'bytes': nbytes, 'base_rss': base_rss, 'peak_rss': rss,
+            'worker_rss': worker_rss}
+
+
+def percentile(sorted_values, p):
+    """线性插值的百分位数，p取0~100"""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(case, raw):
+    latencies = sorted(raw['latencies'])
+    p50 = percentile(latencies, 50)
+    result = {
+        'id': case['id'],
+        'params': {k: v for k, v in case.items() if k not in ('id', 'dataset')},
+        'runs': len(latencies),
+        'latency_s': {
+            'min': latencies[0],
+            'mean': sum(latencies) / len(latencies),
+            'p50': p50,
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99),
+            'max': latencies[-1],
+        },
+        'ops_per_s': 1 / p50 if p50 else None,
+        'throughput_mb_s': raw['bytes'] / MB / p50 if raw['bytes'] and p50 else None,
+        'peak_rss_mb': raw['peak_rss'] / MB if raw['peak_rss'] else None,
+        'base_rss_mb': raw['base_rss'] / MB if raw['base_rss'] else None,
+        'worker_peak_rss_mb': raw['worker_rss'] / MB if raw['worker_rss'] else None,
+    }
+    return result
+
+
+def run_case(case, work_dir, args):
+    """在新的子进程中运行一个用例，使峰值RSS互不影响"""
+    request = json.dumps({'case': case, 'work_dir': work_dir, 'repeat': args.repeat,
+                          'min_time': args.min_time, 'warmup': args.warmup})
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'],
+                          input=request, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'id': case['id'], 'error': proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else
+                f"子进程退出码 {proc.returncode}"}
+    return summarize(case, json.loads(proc.stdout.strip().splitlines()[-1]))
+
+
+# ===== 基线比较 =====
+
+def compare(results, baseline, threshold, rss_slack_mb=2.0):
+    """与基线逐个用例比较中位延迟和峰值RSS，返回比较记录列表"""
+    base_by_id = {result['id']: result for result in baseline.get('results', []) if 'error' not in result}
+    records = []
+    for result in results:
+        base = base_by_id.get(result['id'])
+        if base is None or 'error' in result:
+            continue
+        record = {'id': result['id'], 'regressions': []}
+        ratio = result['latency_s']['p50'] / base['latency_s']['p50']
+        record['p50_ratio'] = round(ratio, 4)
+        if ratio > 1 + threshold:
+            record['regressions'].append('latency')
+        if result['peak_rss_mb'] is not None and base.get('peak_rss_mb') is not None:
+            record['rss_delta_mb'] = round(result['peak_rss_mb'] - base['peak_rss_mb'], 2)
+            # 小用例的RSS主要是解释器本身，加一个固定余量避免噪声误报
+            if result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + threshold) + rss_slack_mb:
+                record['regressions'].append('memory')
+        records.append(record)
+    return records
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    try:
+        from Crypto import __version__ as pycryptodome_version
+    except ImportError:
+        pycryptodome_version = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'pycryptodome': pycryptodome_version,
+        'crypto_workers': CRYPTO_WORKERS,
+        'compress_workers': COMPRESS_WORKERS,
+        'segment_size': crypto_engine.SEGMENT_SIZE,
+        'commit': commit,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="加解密与打包性能基准套件")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick", help="用例规模")
+    parser.add_argument("--filter", action="append", default=[],
+                        help="只运行id匹配该通配符的用例，可重复指定，如 'message.*' 或 '*files=1000*'")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例至少计时的次数")
+    parser.add_argument("--min-time", type=float, default=0.5, help="每个用例至少累计计时的秒数")
+    parser.add_argument("--warmup", type=int, default=1, help="计时前的预热次数")
+    parser.add_argument("-o", "--output", help="结果JSON文件，默认输出到标准输出")
+    parser.add_argument("--baseline", help="基线结果JSON，与之比较并在有退化时以退出码1结束")
+    parser.add_argument("--threshold", type=float, default=0.10, help="允许的退化比例")
+    parser.add_argument("--work-dir", help="测试数据目录，默认使用临时目录并在结束后删除")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        request = json.loads(sys.stdin.read())
+        raw = run_child(request['case'], request['work_dir'], request['repeat'],
+                        request['min_time'], request['warmup'])
+        print(json.dumps(raw))
+        return 0
+
+    def log(message):
+        print(message, file=sys.stderr, flush=True)
+
+    cases = plan_cases(PROFILES[args.profile])
+    if args.filter:
+        cases = [case for case in cases if any(fnmatch.fnmatch(case['id'], pattern) for pattern in args.filter)]
+    if not cases:
+        log("没有匹配的用例")
+        return 2
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="epkg-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        prepare(cases, work_dir, log)
+        results = []
+        for i, case in enumerate(cases):
+            result = run_case(case, work_dir, args)
+            results.append(result)
+            if 'error' in result:
+                log(f"[{i + 1}/{len(cases)}] {case['id']}: ❌ {result['error']}")
+            else:
+                throughput = result['throughput_mb_s']
+                log(f"[{i + 1}/{len(cases)}] {case['id']}: p50 {result['latency_s']['p50'] * 1000:.2f} ms"
+                    f"{f', {throughput:.1f} MB/s' if throughput else ''}"
+                    f", 峰值RSS {result['peak_rss_mb'] or 0:.1f} MiB")
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {'profile': args.profile, 'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+              'environment': environment(), 'results': results}
+    exit_code = 1 if any('error' in result for result in results) else 0
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparison = compare(results, baseline, args.threshold)
+        report['comparison'] = {'baseline': args.baseline, 'threshold': args.threshold, 'cases': comparison}
+        regressed = [record for record in comparison if record['regressions']]
+        for record in regressed:
+            log(f"⚠️ 退化 {record['id']}: {', '.join(record['regressions'])}"
+                f"（中位延迟为基线的 {record['p50_ratio']:.2f} 倍"
+                f"{'，峰值RSS变化 %+.1f MiB' % record['rss_delta_mb'] if 'rss_delta_mb' in record else ''}）")
+        log(f"与基线比较: {len(comparison)} 个用例，{len(regressed)} 个退化")
+        if regressed:
+            exit_code = 1
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
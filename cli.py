@@ -0,0 +1,282 @@
+"""命令行批量加密/解密
+
+用法:
+    python cli.py encrypt -r keys/ -r bob.pem -o out/ --jobs 8 "exports/*.csv" bundles/
+    python cli.py decrypt -k me.pem -k old.pem -o inbox/ --jobs 4 drop/ extra.epkg
+    python cli.py delta -r bob.pem -o sync-0003.epkg project/
+    python cli.py apply -k me.pem -o project/ sync-0001.epkg sync-0002.epkg sync-0003.epkg
+
+每个输入文件生成一个同名.epkg；输入目录把其中的文件（含子目录，保留相对路径）打成一个以目录名命名的.epkg。
+接收方可以是PEM文件或目录（目录中所有.pem文件），也可以用 -g 指定密钥环中的分组。任务在线程池中并发执行，
+结束后向标准输出打印JSON汇总（每个任务的耗时、大小和错误信息），有失败任务时退出码为1。
+
+解密时输入为.epkg文件或目录（目录中所有.epkg文件），每个包解压到输出目录下以包名命名的子目录，
+私钥只导入一次，可指定多把私钥。
+
+加上 --resume 时定期写出检查点，中断后用同样的命令重新运行即从检查点继续。
+
+delta只打包目录自上次运行以来变化的文件，并记录删除的文件；apply按顺序把增量包叠加到上一次的解压目录。
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from crypto_engine import (COMPRESSION_CODECS, DEFAULT_COMPRESSION_LEVEL, DEFAULT_KEYRING_PATH, PACKAGE_JOBS,
+                           Keyring, apply_delta_package, decrypt_packages, encrypt_delta_package, encrypt_package,
+                           list_epkg_files, load_private_keys, public_key_from_private)
+
+
+def load_recipients(sources):
+    """读取接收方公钥，sources为PEM文件或目录；私钥文件只取其公钥部分"""
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths.extend(sorted(glob.glob(os.path.join(source, "*.pem"))))
+        else:
+            paths.append(source)
+    if not paths:
+        return []
+
+    public_keys = []
+    for path in paths:
+        with open(path, 'r') as f:
+            pem = f.read()
+        try:
+            public_keys.append(public_key_from_private(pem) if "PRIVATE KEY" in pem else pem)
+        except (ValueError, TypeError, IndexError) as e:
+            raise ValueError(f"公钥格式错误: {path}: {str(e)}")
+    return public_keys
+
+
+def walk_files(root):
+    """递归列出目录中的文件，返回(文件列表, 以/分隔的相对路径列表)"""
+    files, arcnames = [], []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            files.append(path)
+            arcnames.append(os.path.relpath(path, root).replace(os.sep, '/'))
+    return files, arcnames
+
+
+def plan_jobs(inputs, output_dir):
+    """展开通配符，返回[(任务名, 文件列表, 包内路径列表或None, 输出路径)]"""
+    jobs = []
+    for pattern in inputs:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        for path in matches:
+            if os.path.isdir(path):
+                files, arcnames = walk_files(path)
+                name = os.path.basename(os.path.normpath(path))
+            else:
+                files, arcnames = [path], None
+                name = os.path.basename(path)
+            jobs.append((path, files, arcnames, os.path.join(output_dir, name + ".epkg")))
+    return jobs
+
+
+def run_job(job, public_keys, args):
+    """执行一个加密任务，返回该任务的汇总记录"""
+    source, files, arcnames, output = job
+    record = {"input": source, "output": output, "files": len(files)}
+    start = time.perf_counter()
+    try:
+        if not files:
+            raise ValueError("目录中没有文件")
+        record["bytes_in"] = sum(os.path.getsize(path) for path in files)
+        encrypt_package(files, public_keys, output, args.codec, args.level,
+                        crypto_workers=args.crypto_workers,
+                        compress_workers=args.compress_workers,
+                        arcnames=arcnames, resume=args.resume)
+        record["bytes_out"] = os.path.getsize(output)
+        record["status"] = "ok"
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = str(e)
+    record["seconds"] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def collect_public_keys(args):
+    """合并 -r 指定的公钥文件和 -g 指定的密钥环分组"""
+    public_keys = load_recipients(args.recipients)
+    if args.groups:
+        keyring = Keyring(args.keyring)
+        for group in args.groups:
+            public_keys.extend(keyring.group_keys(group))
+    if not public_keys:
+        raise ValueError("没有找到接收方公钥")
+    return public_keys
+
+
+def read_private_keys(paths):
+    pems = []
+    for path in paths:
+        with open(path, 'r') as f:
+            pems.append(f.read())
+    return load_private_keys("\n".join(pems))
+
+
+def encrypt_command(args):
+    public_keys = collect_public_keys(args)
+    os.makedirs(args.output, exist_ok=True)
+    jobs = plan_jobs(args.inputs, args.output)
+
+    start = time.perf_counter()
+    # 同名输入会写到同一个输出文件，只保留第一个
+    seen = set()
+    unique_jobs, records = [], []
+    for job in jobs:
+        if job[3] in seen:
+            records.append({"input": job[0], "output": job[3], "status": "error",
+                            "error": "输出文件名与其他输入重复", "seconds": 0.0})
+        else:
+            seen.add(job[3])
+            unique_jobs.append(job)
+
+    with ThreadPoolExecutor(args.jobs) as pool:
+        records = list(pool.map(lambda job: run_job(job, public_keys, args), unique_jobs)) + records
+
+    return print_summary({"recipients": len(public_keys)}, records, start)
+
+
+def decrypt_command(args):
+    privkeys = read_private_keys(args.keys)
+    files = list_epkg_files(args.inputs)
+    if not files:
+        raise ValueError("没有找到.epkg文件")
+    os.makedirs(args.output, exist_ok=True)
+
+    start = time.perf_counter()
+    records = decrypt_packages(files, privkeys, args.output, jobs=args.jobs, workers=args.crypto_workers,
+                               resume=args.resume)
+    return print_summary({"keys": len(privkeys)}, records, start)
+
+
+def delta_command(args):
+    public_keys = collect_public_keys(args)
+    start = time.perf_counter()
+    record = {"input": args.input}
+    try:
+        record.update(encrypt_delta_package(args.input, public_keys, args.output, args.manifest,
+                                            args.codec, args.level, crypto_workers=args.crypto_workers,
+                                            compress_workers=args.compress_workers))
+        record["status"] = "ok"
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = str(e)
+    record["seconds"] = round(time.perf_counter() - start, 4)
+    return print_summary({"recipients": len(public_keys)}, [record], start)
+
+
+def apply_command(args):
+    privkeys = read_private_keys(args.keys)
+    os.makedirs(args.output, exist_ok=True)
+    start = time.perf_counter()
+    records = []
+    # 增量包必须按代数顺序叠加，前一个失败后不再继续
+    for path in args.inputs:
+        record = {"input": path}
+        job_start = time.perf_counter()
+        try:
+            info = apply_delta_package(path, privkeys, args.output, workers=args.crypto_workers)
+            record.update(generation=info["generation"], deleted=len(info["deleted"]), status="ok")
+        except Exception as e:
+            record.update(status="error", error=str(e))
+        record["seconds"] = round(time.perf_counter() - job_start, 4)
+        records.append(record)
+        if record["status"] != "ok":
+            break
+    return print_summary({"keys": len(privkeys)}, records, start)
+
+
+def print_summary(fields, records, start):
+    """向标准输出打印JSON汇总，返回退出码"""
+    failed = sum(1 for record in records if record["status"] != "ok")
+    summary = dict(fields)
+    summary.update({
+        "jobs": len(records),
+        "succeeded": len(records) - failed,
+        "failed": failed,
+        "seconds": round(time.perf_counter() - start, 4),
+        "results": records,
+    })
+    json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
+    return 1 if failed else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="非对称加解密器命令行批量模式")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    encrypt = subparsers.add_parser("encrypt", help="把输入文件批量加密为.epkg")
+    encrypt.add_argument("inputs", nargs="+", help="输入文件、目录或通配符")
+    encrypt.add_argument("-r", "--recipient", dest="recipients", action="append", default=[],
+                         help="接收方公钥PEM文件或包含.pem文件的目录，可重复指定")
+    encrypt.add_argument("-g", "--group", dest="groups", action="append", default=[],
+                         help="密钥环中的接收方分组，可重复指定")
+    encrypt.add_argument("--keyring", default=DEFAULT_KEYRING_PATH, help="密钥环文件路径")
+    encrypt.add_argument("-o", "--output", required=True, help="输出目录")
+    encrypt.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="并发任务数")
+    encrypt.add_argument("--codec", choices=["auto"] + sorted(COMPRESSION_CODECS), default="auto", help="压缩方式")
+    encrypt.add_argument("--level", type=int, default=DEFAULT_COMPRESSION_LEVEL, help="压缩级别")
+    # 并发来自任务之间，单个任务内部默认不再并行
+    encrypt.add_argument("--crypto-workers", type=int, default=1, help="单个任务的分段加密线程数")
+    encrypt.add_argument("--compress-workers", type=int, default=1, help="单个任务的压缩进程数")
+    encrypt.add_argument("--resume", action="store_true",
+                         help="写出检查点，中断后重新运行同样的命令从检查点继续")
+    encrypt.set_defaults(handler=encrypt_command)
+
+    decrypt = subparsers.add_parser("decrypt", help="批量解密.epkg，每个包解压到单独的子目录")
+    decrypt.add_argument("inputs", nargs="+", help=".epkg文件或包含.epkg文件的目录")
+    decrypt.add_argument("-k", "--key", dest="keys", action="append", required=True,
+                         help="私钥PEM文件，可重复指定，按加密包中的密钥ID自动选用")
+    decrypt.add_argument("-o", "--output", required=True, help="输出目录")
+    decrypt.add_argument("-j", "--jobs", type=int, default=PACKAGE_JOBS, help="同时解密的加密包数")
+    decrypt.add_argument("--crypto-workers", type=int, default=1, help="单个包的分段解密线程数")
+    decrypt.add_argument("--resume", action="store_true",
+                         help="写出检查点，中断后重新运行同样的命令从检查点继续")
+    decrypt.set_defaults(handler=decrypt_command)
+
+    delta = subparsers.add_parser("delta", help="只把目录自上次以来的变化打成增量包")
+    delta.add_argument("input", help="源目录")
+    delta.add_argument("-r", "--recipient", dest="recipients", action="append", default=[],
+                       help="接收方公钥PEM文件或包含.pem文件的目录，可重复指定")
+    delta.add_argument("-g", "--group", dest="groups", action="append", default=[],
+                       help="密钥环中的接收方分组，可重复指定")
+    delta.add_argument("--keyring", default=DEFAULT_KEYRING_PATH, help="密钥环文件路径")
+    delta.add_argument("-o", "--output", required=True, help="输出的.epkg文件")
+    delta.add_argument("--manifest", help="清单文件路径，默认按源目录存放在 ~/.epkg-manifests/")
+    delta.add_argument("--codec", choices=["auto"] + sorted(COMPRESSION_CODECS), default="auto", help="压缩方式")
+    delta.add_argument("--level", type=int, default=DEFAULT_COMPRESSION_LEVEL, help="压缩级别")
+    delta.add_argument("--crypto-workers", type=int, default=1, help="分段加密线程数")
+    delta.add_argument("--compress-workers", type=int, default=1, help="压缩进程数")
+    delta.set_defaults(handler=delta_command)
+
+    apply = subparsers.add_parser("apply", help="按顺序把增量包叠加到上一次的解压目录")
+    apply.add_argument("inputs", nargs="+", help="增量包，按生成顺序排列")
+    apply.add_argument("-k", "--key", dest="keys", action="append", required=True,
+                       help="私钥PEM文件，可重复指定")
+    apply.add_argument("-o", "--output", required=True, help="解压目录")
+    apply.add_argument("--crypto-workers", type=int, default=1, help="分段解密线程数")
+    apply.set_defaults(handler=apply_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except (OSError, ValueError) as e:
+        print(f"错误: {str(e)}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
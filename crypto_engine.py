@@ -0,0 +1,2240 @@
+"""无界面的加解密引擎
+
+包含RSA密钥生成、文本消息加解密和.epkg加密包的读写。只依赖标准库和pycryptodome，
+不导入tkinter，可直接用于批处理脚本或服务进程。
+
+除了加锁保护的密钥缓存key_cache外不持有模块级可变状态，每次调用各自创建密码对象，
+可以在多个线程中并发调用。
+耗时函数接受progress(已处理字节, 总字节)回调；回调抛出的异常（例如OperationCancelled）
+会中止操作，已写出的不完整输出会被清理。
+"""
+import base64
+import bz2
+import collections
+import hashlib
+import io
+import json
+import os
+import queue
+import re
+import secrets
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from Crypto.PublicKey import RSA, ECC
+from Crypto.Cipher import PKCS1_OAEP, AES
+from Crypto.Hash import SHA256
+from Crypto.Protocol.DH import key_agreement
+from Crypto.Protocol.KDF import HKDF
+from Crypto.Util.asn1 import DerSequence, DerBitString
+
+
+# ===== .epkg 容器格式 =====
+# v1: [4字节长度][RSA(aes_key + nonce + tag)][整体AES-GCM密文]
+# v2: [头部][分段1]...[分段N]，每个分段 = 密文 + 16字节tag
+#     头部 = magic + 版本 + 标志位 + 分段大小 + nonce前缀 + 密钥槽数量 + 密钥槽
+#     密钥槽 = [2字节长度][RSA-OAEP封装的AES密钥]
+# v3: 同v2，密钥槽前增加1字节类型，支持ECC接收方
+# v4: 同v3，密钥槽类型后增加8字节接收方密钥ID，解密时按ID直接选出私钥和密钥槽
+EPKG_MAGIC = b"EPKG"
+EPKG_VERSION = 4
+SEGMENT_SIZE = 1024 * 1024  # 每个分段的明文长度
+TAG_SIZE = 16
+AES_KEY_SIZE = 32
+NONCE_PREFIX_SIZE = 7
+_EPKG_HEADER = struct.Struct(">4sBBI7sH")
+_SLOT_LEN = struct.Struct(">H")
+_TYPED_SLOT = struct.Struct(">BH")
+_KEYED_SLOT = struct.Struct(">B8sH")
+KEY_ID_SIZE = 8
+# 密钥槽类型：RSA-OAEP，或ECIES（临时ECDH + HKDF-SHA256 + AES-GCM封装），后者按曲线区分
+SLOT_RSA_OAEP = 0x01
+_ECIES_SLOT_TYPES = {'NIST P-256': 0x02, 'NIST P-384': 0x03, 'NIST P-521': 0x04}
+_ECIES_INFO = b"EPKG ECIES key wrap"
+# 每次封装都使用新的临时密钥，派生出的KEK只用一次，nonce可以固定
+_ECIES_NONCE = bytes(12)
+# 标志位: 包末尾附带加密的成员索引 [索引密文+tag][8字节索引长度]["EIDX"]
+EPKG_FLAG_INDEX = 0x01
+# 标志位: 单文件加密(.enc)，正文直接是文件内容而不是ZIP
+EPKG_FLAG_RAW = 0x02
+_INDEX_TRAILER = struct.Struct(">Q4s")
+_INDEX_MAGIC = b"EIDX"
+# 分段并行加解密的默认线程数
+CRYPTO_WORKERS = min(32, os.cpu_count() or 1)
+
+
+class EpkgFormatError(ValueError):
+    """加密包格式错误"""
+
+
+def _segment_nonce(nonce_prefix, index, final):
+    """派生分段nonce: 前缀(7) + 分段序号(4) + 末段标记(1)"""
+    return nonce_prefix + index.to_bytes(4, 'big') + (b"\x01" if final else b"\x00")
+
+
+def _index_nonce(nonce_prefix):
+    """成员索引使用独立的nonce域，与数据分段互不重叠"""
+    return nonce_prefix + b"\xff\xff\xff\xff\x02"
+
+
+def write_epkg_header(f, nonce_prefix, wrapped_keys, segment_size=SEGMENT_SIZE, flags=0):
+    """写入v4头部，wrapped_keys为[(槽类型, 密钥ID, 槽数据)]，返回用作分段附加认证数据(AAD)的头部摘要"""
+    header = bytearray(_EPKG_HEADER.pack(EPKG_MAGIC, EPKG_VERSION, flags, segment_size,
+                                         nonce_prefix, len(wrapped_keys)))
+    for slot_type, slot_key_id, wrapped in wrapped_keys:
+        header += _KEYED_SLOT.pack(slot_type, slot_key_id, len(wrapped)) + wrapped
+    f.write(header)
+    return hashlib.sha256(header).digest()
+
+
+def read_epkg_version(f):
+    """探测加密包版本，读取后文件指针回到开头"""
+    magic = f.read(len(EPKG_MAGIC))
+    version = 1
+    if magic == EPKG_MAGIC:
+        version = f.read(1)[0]
+    f.seek(0)
+    return version
+
+
+def read_epkg_header(f):
+    """读取v2~v4头部，密钥槽统一为[(槽类型, 密钥ID, 槽数据)]，v4之前的密钥ID为None"""
+    raw = f.read(_EPKG_HEADER.size)
+    if len(raw) < _EPKG_HEADER.size:
+        raise EpkgFormatError("加密包头部不完整")
+    magic, version, flags, segment_size, nonce_prefix, slot_count = _EPKG_HEADER.unpack(raw)
+    if magic != EPKG_MAGIC or version not in (2, 3, 4):
+        raise EpkgFormatError(f"不支持的加密包版本: {version}")
+    header = bytearray(raw)
+    slots = []
+    slot_struct = {2: _SLOT_LEN, 3: _TYPED_SLOT, 4: _KEYED_SLOT}[version]
+    for _ in range(slot_count):
+        slot_raw = f.read(slot_struct.size)
+        if len(slot_raw) < slot_struct.size:
+            raise EpkgFormatError("密钥槽不完整")
+        slot_key_id = None
+        if version == 2:
+            slot_type, (slot_len,) = SLOT_RSA_OAEP, _SLOT_LEN.unpack(slot_raw)
+        elif version == 3:
+            slot_type, slot_len = _TYPED_SLOT.unpack(slot_raw)
+        else:
+            slot_type, slot_key_id, slot_len = _KEYED_SLOT.unpack(slot_raw)
+        wrapped = f.read(slot_len)
+        if len(wrapped) < slot_len:
+            raise EpkgFormatError("密钥槽不完整")
+        header += slot_raw + wrapped
+        slots.append((slot_type, slot_key_id, wrapped))
+    return {
+        'flags': flags,
+        'segment_size': segment_size,
+        'nonce_prefix': nonce_prefix,
+        'slots': slots,
+        'aad': hashlib.sha256(header).digest(),
+        'body_offset': len(header),
+    }
+
+
+def _ecies_kek(shared_secret, ephemeral_pub, recipient_pub):
+    """由ECDH共享秘密派生封装密钥，盐绑定临时公钥和接收方公钥"""
+    return HKDF(shared_secret, AES_KEY_SIZE, ephemeral_pub + recipient_pub, SHA256, context=_ECIES_INFO)
+
+
+def _sec1(key):
+    return key.public_key().export_key(format='SEC1', compress=True)
+
+
+def _public_part(key):
+    return key.public_key() if isinstance(key, ECC.EccKey) else key.publickey()
+
+
+def _public_der(key):
+    """公钥部分的DER编码（SubjectPublicKeyInfo）"""
+    return _public_part(key).export_key(format='DER')
+
+
+def key_id(key):
+    """接收方密钥ID：公钥DER的SHA-256前8字节，即密钥指纹的前16位十六进制"""
+    return hashlib.sha256(_public_der(key)).digest()[:KEY_ID_SIZE]
+
+
+class PrivateKeySet:
+    """一组已导入的私钥，按密钥ID索引"""
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self._by_id = {key_id(key): key for key in self.keys}
+
+    def find(self, slot_key_id):
+        return self._by_id.get(slot_key_id)
+
+    def rsa_keys(self, what):
+        """旧格式只支持RSA密钥，返回其中的RSA私钥"""
+        keys = [key for key in self.keys if isinstance(key, RSA.RsaKey)]
+        if not keys:
+            raise EpkgFormatError(f"{what}只支持RSA密钥")
+        return keys
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def wrap_key(aes_key, pubkey):
+    """用接收方公钥（RSA或ECC密钥对象）封装AES密钥，返回(槽类型, 密钥ID, 槽数据)"""
+    if isinstance(pubkey, ECC.EccKey):
+        slot_type = _ECIES_SLOT_TYPES.get(pubkey.curve)
+        if slot_type is None:
+            raise ValueError(f"不支持的椭圆曲线: {pubkey.curve}")
+        ephemeral = ECC.generate(curve=pubkey.curve)
+        ephemeral_pub, recipient_pub = _sec1(ephemeral), _sec1(pubkey)
+        kek = key_agreement(eph_priv=ephemeral, static_pub=pubkey.public_key(),
+                            kdf=lambda z: _ecies_kek(z, ephemeral_pub, recipient_pub))
+        ciphertext, tag = AES.new(kek, AES.MODE_GCM, nonce=_ECIES_NONCE).encrypt_and_digest(aes_key)
+        return slot_type, key_id(pubkey), ephemeral_pub + ciphertext + tag
+    return SLOT_RSA_OAEP, key_id(pubkey), PKCS1_OAEP.new(pubkey).encrypt(aes_key)
+
+
+def _unwrap_slot(privkey, slot_type, wrapped):
+    """尝试用私钥解开一个密钥槽，类型不符或密钥不匹配时返回None"""
+    if isinstance(privkey, ECC.EccKey):
+        if slot_type != _ECIES_SLOT_TYPES.get(privkey.curve) or len(wrapped) <= AES_KEY_SIZE + TAG_SIZE:
+            return None
+        ephemeral_pub = wrapped[:-(AES_KEY_SIZE + TAG_SIZE)]
+        ciphertext, tag = wrapped[-(AES_KEY_SIZE + TAG_SIZE):-TAG_SIZE], wrapped[-TAG_SIZE:]
+        try:
+            ephemeral = ECC.import_key(ephemeral_pub, curve_name=privkey.curve)
+            kek = key_agreement(static_priv=privkey, eph_pub=ephemeral,
+                                kdf=lambda z: _ecies_kek(z, ephemeral_pub, _sec1(privkey)))
+            return AES.new(kek, AES.MODE_GCM, nonce=_ECIES_NONCE).decrypt_and_verify(ciphertext, tag)
+        except ValueError:
+            return None
+    if slot_type != SLOT_RSA_OAEP:
+        return None
+    try:
+        aes_key = PKCS1_OAEP.new(privkey).decrypt(wrapped)
+    except ValueError:
+        return None
+    return aes_key if len(aes_key) == AES_KEY_SIZE else None
+
+
+def unwrap_epkg_key(header, privkeys):
+    """解出AES密钥；privkeys为RSA/ECC私钥对象或PrivateKeySet
+
+    v4密钥槽带有接收方密钥ID，按ID查出对应的私钥，只对匹配的槽做一次解封；
+    更早的版本没有密钥ID，只能逐个私钥、逐个槽尝试
+    """
+    if not isinstance(privkeys, PrivateKeySet):
+        privkeys = PrivateKeySet([privkeys])
+    for slot_type, slot_key_id, wrapped in header['slots']:
+        if slot_key_id is None:
+            candidates = privkeys
+        else:
+            privkey = privkeys.find(slot_key_id)
+            candidates = [privkey] if privkey is not None else []
+        for privkey in candidates:
+            aes_key = _unwrap_slot(privkey, slot_type, wrapped)
+            if aes_key is not None:
+                return aes_key
+    raise EpkgFormatError("私钥与该加密包不匹配")
+
+
+def build_epkg_index(zf, segment_size=SEGMENT_SIZE):
+    """根据已关闭的ZipFile生成成员索引：名称、大小、明文偏移和分段范围"""
+    infos = sorted(zf.infolist(), key=lambda info: info.header_offset)
+    entries = []
+    for i, info in enumerate(infos):
+        # 成员占据从本地文件头到下一个成员(或中央目录)之前的区间
+        end = infos[i + 1].header_offset if i + 1 < len(infos) else zf.start_dir
+        entries.append({
+            'name': info.filename,
+            'size': info.file_size,
+            'compress_size': info.compress_size,
+            'compress_type': info.compress_type,
+            'crc': info.CRC,
+            'offset': info.header_offset,
+            'length': end - info.header_offset,
+            'segments': [info.header_offset // segment_size, max(end - 1, 0) // segment_size],
+        })
+    return entries
+
+
+def write_epkg_index(f, aes_key, nonce_prefix, aad, entries):
+    """在数据分段之后写入单独认证的加密索引和尾部定位信息"""
+    cipher = AES.new(aes_key, AES.MODE_GCM, nonce=_index_nonce(nonce_prefix))
+    cipher.update(aad)
+    ciphertext, tag = cipher.encrypt_and_digest(json.dumps(entries, ensure_ascii=False).encode())
+    f.write(ciphertext)
+    f.write(tag)
+    f.write(_INDEX_TRAILER.pack(len(ciphertext) + TAG_SIZE, _INDEX_MAGIC))
+
+
+def _read_index_trailer(f, header, file_size):
+    """返回(索引偏移, 索引长度)"""
+    f.seek(file_size - _INDEX_TRAILER.size)
+    index_length, magic = _INDEX_TRAILER.unpack(f.read(_INDEX_TRAILER.size))
+    index_offset = file_size - _INDEX_TRAILER.size - index_length
+    if magic != _INDEX_MAGIC or index_offset < header['body_offset']:
+        raise EpkgFormatError("加密包索引已损坏")
+    return index_offset, index_length
+
+
+def epkg_body_length(f, header, file_size):
+    """计算数据分段区的总长度（不含索引和尾部）"""
+    if header['flags'] & EPKG_FLAG_INDEX:
+        index_offset, _ = _read_index_trailer(f, header, file_size)
+        return index_offset - header['body_offset']
+    return file_size - header['body_offset']
+
+
+def read_epkg_index(f, header, aes_key, file_size):
+    """只解密成员索引，不触及数据分段"""
+    if not header['flags'] & EPKG_FLAG_INDEX:
+        raise EpkgFormatError("该加密包不包含成员索引")
+    index_offset, index_length = _read_index_trailer(f, header, file_size)
+    f.seek(index_offset)
+    block = f.read(index_length)
+    cipher = AES.new(aes_key, AES.MODE_GCM, nonce=_index_nonce(header['nonce_prefix']))
+    cipher.update(header['aad'])
+    return json.loads(cipher.decrypt_and_verify(block[:-TAG_SIZE], block[-TAG_SIZE:]))
+
+
+def _encrypt_segment(aes_key, nonce_prefix, aad, index, view, final):
+    """原地加密memoryview中的单个分段，返回tag；无共享状态，可在线程池中并行执行"""
+    cipher = AES.new(aes_key, AES.MODE_GCM, nonce=_segment_nonce(nonce_prefix, index, final))
+    cipher.update(aad)
+    cipher.encrypt(view, output=view)
+    return cipher.digest()
+
+
+def _decrypt_segment(aes_key, nonce_prefix, aad, index, block, final):
+    """原地解密并认证memoryview中的单个分段（密文+tag），返回明文部分的memoryview
+
+    认证失败时缓冲区中是未经认证的数据，调用方不得再使用它；无共享状态，可在线程池中并行执行
+    """
+    if len(block) < TAG_SIZE:
+        raise EpkgFormatError("加密包已被截断")
+    body = block[:-TAG_SIZE]
+    cipher = AES.new(aes_key, AES.MODE_GCM, nonce=_segment_nonce(nonce_prefix, index, final))
+    cipher.update(aad)
+    cipher.decrypt(body, output=body)
+    cipher.verify(block[-TAG_SIZE:])
+    return body
+
+
+class SegmentWriter:
+    """分段加密写入器：按固定大小切分明文，每段独立AES-GCM加密和认证
+
+    workers > 1 时分段在线程池中并行加密，按序号顺序写出。
+    明文复制进固定的分段缓冲区后原地加密，缓冲区循环复用，内存占用与数据量无关
+    """
+    def __init__(self, fileobj, aes_key, nonce_prefix, aad, segment_size=SEGMENT_SIZE, workers=1):
+        self.fileobj = fileobj
+        self.aes_key = aes_key
+        self.nonce_prefix = nonce_prefix
+        self.aad = aad
+        self.segment_size = segment_size
+        self.segment_index = 0
+        self.position = 0
+        # 当前分段的缓冲区，第一段按需增长（短消息不必分配整个分段），之后原地复用
+        self._buffer = bytearray()
+        self._filled = 0
+        self.closed = False
+        self._executor = ThreadPoolExecutor(workers) if workers > 1 else None
+        # 限制在途分段数量，内存占用保持在 2 * workers + 1 个分段缓冲区以内
+        self._pending = collections.deque()
+        self._max_pending = 2 * workers
+        self._free_buffers = []
+
+    def write(self, data):
+        if self.closed:
+            # 中止后异常展开时zipfile仍会写出数据描述符和中央目录，直接丢弃
+            return len(data)
+        with memoryview(data) as view, view.cast('B') as data:
+            offset = 0
+            while offset < len(data):
+                # 末段必须在close时写出，因此缓冲区已满且还有后续数据时才输出
+                if self._filled == self.segment_size:
+                    self._write_segment(final=False)
+                n = min(self.segment_size - self._filled, len(data) - offset)
+                chunk = data[offset:offset + n]
+                if self._filled == len(self._buffer):
+                    self._buffer += chunk
+                else:
+                    # 切片赋值给bytearray时会先复制一份非bytearray的数据，经memoryview写入则不会
+                    with memoryview(self._buffer) as target:
+                        target[self._filled:self._filled + n] = chunk
+                self._filled += n
+                offset += n
+            self.position += len(data)
+            return len(data)
+
+    def _write_segment(self, final):
+        buffer, view = self._buffer, memoryview(self._buffer)[:self._filled]
+        args = (self.aes_key, self.nonce_prefix, self.aad, self.segment_index, view, final)
+        self.segment_index += 1
+        self._filled = 0
+        if self._executor is None:
+            self._write_block(view, _encrypt_segment(*args))
+            view.release()
+            return
+        self._pending.append((buffer, view, self._executor.submit(_encrypt_segment, *args)))
+        # 在途分段占用原缓冲区，换一个空闲的继续接收明文
+        self._buffer = self._free_buffers.pop() if self._free_buffers else bytearray()
+        while len(self._pending) >= self._max_pending:
+            self._write_oldest()
+
+    def _write_oldest(self):
+        buffer, view, future = self._pending.popleft()
+        self._write_block(view, future.result())
+        view.release()
+        self._free_buffers.append(buffer)
+
+    def _write_block(self, ciphertext, tag):
+        self.fileobj.write(ciphertext)
+        self.fileobj.write(tag)
+
+    def tell(self):
+        return self.position
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def align(self):
+        """补零到分段边界并把凑满的分段写出，之后缓冲区中不再有明文；返回补零的字节数
+
+        只能在之后还会写入数据时调用：凑满的分段按非末段加密
+        """
+        padding = -self.position % self.segment_size
+        if padding:
+            self.write(bytes(padding))
+        if self._filled == self.segment_size:
+            self._write_segment(final=False)
+        return padding
+
+    def sync(self):
+        """在分段边界（align之后）等待在途分段按序写出并落盘，返回已写出的分段数"""
+        if self._filled:
+            raise ValueError("还有未写出的明文，需要先对齐到分段边界")
+        while self._pending:
+            self._write_oldest()
+        self.fileobj.flush()
+        os.fsync(self.fileobj.fileno())
+        return self.segment_index
+
+    def resume(self, segment_index):
+        """从检查点继续：文件中已有segment_index个完整分段，之后的明文从分段边界开始"""
+        self.segment_index = segment_index
+        self.position = segment_index * self.segment_size
+
+    def close(self):
+        """写出带末段标记的最后一段，并等待所有在途分段按序落盘"""
+        if not self.closed:
+            self._write_segment(final=True)
+            while self._pending:
+                self._write_oldest()
+            self._buffer = bytearray()
+            self._free_buffers.clear()
+            self._shutdown()
+            self.closed = True
+
+    def abort(self):
+        """放弃未写出的分段并释放线程池（取消或出错时使用）"""
+        for _, _, future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._shutdown()
+        self.closed = True
+
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+class OperationCancelled(Exception):
+    """用户取消了操作"""
+
+
+class SegmentReader:
+    """分段解密读取器：可随机访问的只读文件对象，按需解密并认证分段
+
+    workers > 1 时顺序读取会预取后续分段，在线程池中并行解密。
+    密文用readinto读入缓冲区后原地解密；不预取时只复用一个分段缓冲区，
+    预取时每个在途分段占用一个缓冲区，用完后放回空闲列表循环复用
+    """
+    def __init__(self, fileobj, header, aes_key, body_length, progress=None, workers=1):
+        self.fileobj = fileobj
+        self.header = header
+        self.aes_key = aes_key
+        self.body_offset = header['body_offset']
+        self.segment_size = header['segment_size']
+        self.stride = self.segment_size + TAG_SIZE
+        self.body_length = body_length
+        self.segment_count = max(1, -(-body_length // self.stride))
+        last_length = body_length - (self.segment_count - 1) * self.stride
+        if last_length < TAG_SIZE:
+            raise EpkgFormatError("加密包已被截断")
+        self.size = (self.segment_count - 1) * self.segment_size + last_length - TAG_SIZE
+        self.position = 0
+        self.progress = progress
+        # 进度按已认证的明文字节数计算：zipfile先读末尾的中央目录，按位置报告会先到100%再跳回
+        self._authenticated = set()
+        self._authenticated_bytes = 0
+        self._cached_index = None
+        self._cached = b""
+        self._cached_buffer = None  # 当前分段来自预取时所占用的缓冲区
+        self._block_buffer = None
+        self._free_buffers = []
+        self._workers = workers
+        self._executor = ThreadPoolExecutor(workers) if workers > 1 else None
+        self._prefetched = {}
+        self._prefetch_end = self.segment_count
+
+    def _read_block(self, index, buffer):
+        """把分段密文读入缓冲区，返回有效部分的memoryview；文件只在调用线程中访问，工作线程只做解密"""
+        length = min(self.stride, self.body_length - index * self.stride)
+        view = memoryview(buffer)[:length]
+        self.fileobj.seek(self.body_offset + index * self.stride)
+        filled = 0
+        while filled < length:
+            n = self.fileobj.readinto(view[filled:])
+            if not n:
+                break
+            filled += n
+        return view[:filled]
+
+    def _decrypt_args(self, index, buffer):
+        final = index == self.segment_count - 1
+        return (self.aes_key, self.header['nonce_prefix'], self.header['aad'],
+                index, self._read_block(index, buffer), final)
+
+    def _prefetch(self, start):
+        """提交从start开始的若干分段到线程池，丢弃不再需要的预取结果"""
+        end = min(start + self._workers, self._prefetch_end)
+        for index in list(self._prefetched):
+            if not start <= index < end:
+                self._discard_prefetch(index)
+        for index in range(start, end):
+            if index not in self._prefetched:
+                # 在途数量受线程数限制，缓冲区数量也就不超过 workers + 1
+                buffer = self._free_buffers.pop() if self._free_buffers else bytearray(self.stride)
+                future = self._executor.submit(_decrypt_segment, *self._decrypt_args(index, buffer))
+                self._prefetched[index] = (buffer, future)
+
+    def _discard_prefetch(self, index):
+        buffer, future = self._prefetched.pop(index)
+        # 已在解密中的分段仍在使用缓冲区，不能放回
+        if future.cancel():
+            self._free_buffers.append(buffer)
+
+    def limit_prefetch(self, end_segment):
+        """限制预取范围（不含end_segment），随机提取时避免解密用不到的分段"""
+        self._prefetch_end = min(end_segment, self.segment_count)
+
+    def _segment(self, index):
+        if index != self._cached_index:
+            # 共享缓冲区即将被覆盖，认证失败时也不能再返回旧内容
+            self._cached_index = None
+            self._cached = b""
+            if self._cached_buffer is not None:
+                self._free_buffers.append(self._cached_buffer)
+                self._cached_buffer = None
+            prefetched = self._prefetched.pop(index, None)
+            if prefetched is not None:
+                buffer, future = prefetched
+                try:
+                    self._cached = future.result()
+                except BaseException:
+                    # 认证失败的缓冲区内容不可信，但可以复用
+                    self._free_buffers.append(buffer)
+                    raise
+                self._cached_buffer = buffer
+            else:
+                if self._block_buffer is None:
+                    self._block_buffer = bytearray(min(self.stride, self.body_length))
+                self._cached = _decrypt_segment(*self._decrypt_args(index, self._block_buffer))
+            self._cached_index = index
+            if index not in self._authenticated:
+                self._authenticated.add(index)
+                self._authenticated_bytes += len(self._cached)
+            if self.progress:
+                self.progress(self._authenticated_bytes, self.size)
+            if self._executor is not None:
+                self._prefetch(index + 1)
+        return self._cached
+
+    def copy_to(self, out):
+        """从当前位置起把剩余明文逐段写入out，不经过中间bytes；末段一并认证"""
+        index, offset = divmod(self.position, self.segment_size)
+        for index in range(index, self.segment_count):
+            segment = self._segment(index)
+            out.write(segment[offset:])
+            offset = 0
+        self.position = self.size
+
+    def verify_end(self):
+        """认证最后一个分段；明文长度是分段大小的整数倍时，读到明文末尾不会触及空的末尾分段"""
+        self._segment(self.segment_count - 1)
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self.size - self.position
+        n = max(0, min(n, self.size - self.position))
+        parts = []
+        while n > 0:
+            index, offset = divmod(self.position, self.segment_size)
+            # 分段缓冲区会被复用，返回前复制出来
+            part = bytes(self._segment(index)[offset:offset + n])
+            parts.append(part)
+            self.position += len(part)
+            n -= len(part)
+        return b"".join(parts)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self.position = offset
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def close(self):
+        for _, future in self._prefetched.values():
+            future.cancel()
+        self._prefetched.clear()
+        self._free_buffers.clear()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+class ChunkReader:
+    """把逐块产出明文的迭代器包装成只能顺序读取的文件对象"""
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = bytearray()
+
+    def read(self, n):
+        while len(self._buffer) < n:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        data = bytes(self._buffer[:n])
+        del self._buffer[:n]
+        return data
+
+    def drain(self):
+        """读完剩余数据，使迭代器末尾的认证检查得以执行"""
+        self._buffer = bytearray()
+        for _ in self._chunks:
+            pass
+
+
+_ZIP_LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+_ZIP_LOCAL_SIGNATURE = b"PK\x03\x04"
+
+
+def _safe_member_path(dest_dir, name):
+    """与zipfile.extract相同的路径清理规则，防止成员逃逸出解压目录"""
+    arcname = name.replace('/', os.path.sep)
+    if os.path.altsep:
+        arcname = arcname.replace(os.path.altsep, os.path.sep)
+    arcname = os.path.splitdrive(arcname)[1]
+    parts = [x for x in arcname.split(os.path.sep) if x not in ('', os.path.curdir, os.path.pardir)]
+    return os.path.normpath(os.path.join(dest_dir, *parts)) if parts else None
+
+
+def _zip_decompressor(method):
+    if method == zipfile.ZIP_STORED:
+        return None
+    if method == zipfile.ZIP_DEFLATED:
+        return zlib.decompressobj(-15)
+    if method == zipfile.ZIP_BZIP2:
+        return bz2.BZ2Decompressor()
+    if method == zipfile.ZIP_LZMA:
+        return zipfile.LZMADecompressor()
+    raise EpkgFormatError(f"不支持的压缩方式: {method}")
+
+
+def extract_zip_stream(stream, dest_dir):
+    """顺序解析ZIP本地文件头并逐个解压成员（用于v1：本地头中带有完整大小）"""
+    while True:
+        raw = stream.read(_ZIP_LOCAL_HEADER.size)
+        if len(raw) < _ZIP_LOCAL_HEADER.size or raw[:4] != _ZIP_LOCAL_SIGNATURE:
+            break  # 到达中央目录
+        (_, _, flags, method, _, _, crc, compress_size, file_size,
+         name_len, extra_len) = _ZIP_LOCAL_HEADER.unpack(raw)
+        name_raw = stream.read(name_len)
+        extra = stream.read(extra_len)
+        if flags & 0x08:
+            raise EpkgFormatError("ZIP成员缺少本地大小信息，无法流式解压")
+        name = name_raw.decode('utf-8' if flags & 0x800 else 'cp437')
+
+        # ZIP64扩展字段
+        if file_size == 0xFFFFFFFF or compress_size == 0xFFFFFFFF:
+            pos = 0
+            while pos + 4 <= len(extra):
+                tag, size = struct.unpack_from("<HH", extra, pos)
+                if tag == 0x0001:
+                    fields = iter(struct.unpack_from(f"<{size // 8}Q", extra, pos + 4))
+                    if file_size == 0xFFFFFFFF:
+                        file_size = next(fields)
+                    if compress_size == 0xFFFFFFFF:
+                        compress_size = next(fields)
+                    break
+                pos += 4 + size
+
+        _extract_zip_member(stream, dest_dir, name, method, compress_size, crc)
+
+
+# 压缩方式: 名称 -> zipfile压缩类型；"auto"根据采样结果在不压缩和deflate之间选择
+COMPRESSION_CODECS = {
+    'stored': zipfile.ZIP_STORED,
+    'deflate': zipfile.ZIP_DEFLATED,
+    'bz2': zipfile.ZIP_BZIP2,
+    'lzma': zipfile.ZIP_LZMA,
+}
+DEFAULT_COMPRESSION_LEVEL = 6
+_COMPRESSION_SAMPLE_SIZE = 64 * 1024
+_COMPRESS_READ_SIZE = 256 * 1024
+_INCOMPRESSIBLE_RATIO = 0.9
+
+
+def is_incompressible(file_path):
+    """采样文件开头的一块数据，压缩后节省不到10%即视为不可压缩（图片、视频、压缩包、密文等）"""
+    with open(file_path, 'rb') as f:
+        sample = f.read(_COMPRESSION_SAMPLE_SIZE)
+    if not sample:
+        return True
+    return len(zlib.compress(sample, 1)) > len(sample) * _INCOMPRESSIBLE_RATIO
+
+
+def choose_compression(file_path, codec='auto', level=DEFAULT_COMPRESSION_LEVEL):
+    """为单个成员选择(zipfile压缩类型, 压缩级别)"""
+    if codec == 'auto':
+        if is_incompressible(file_path):
+            return zipfile.ZIP_STORED, None
+        return zipfile.ZIP_DEFLATED, level
+    if codec not in COMPRESSION_CODECS:
+        raise ValueError(f"未知的压缩方式: {codec}")
+    compress_type = COMPRESSION_CODECS[codec]
+    return compress_type, (None if compress_type == zipfile.ZIP_STORED else level)
+
+
+def _read_chunks(f, size=SEGMENT_SIZE):
+    """用readinto把文件逐块读入同一个缓冲区，产出memoryview；下一次迭代前必须用完上一块"""
+    buffer = bytearray(size)
+    with memoryview(buffer) as view:
+        while True:
+            n = f.readinto(view)
+            if not n:
+                break
+            yield view[:n]
+
+
+def write_zip_member(zf, file_path, arcname, compress_type, level, on_chunk=None):
+    """按指定压缩方式把文件流式写入ZIP，每读入一块调用on_chunk(字节数)"""
+    zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+    zinfo.compress_type = compress_type
+    # zipfile没有按成员指定压缩级别的公开接口，ZipFile.write内部也是这样设置的
+    zinfo._compresslevel = level
+    # 压缩器每次调用都会分配与输入同量级的输出，压缩时用较小的块限制峰值内存
+    read_size = SEGMENT_SIZE if compress_type == zipfile.ZIP_STORED else _COMPRESS_READ_SIZE
+    with open(file_path, 'rb') as src, zf.open(zinfo, 'w') as dst:
+        for chunk in _read_chunks(src, read_size):
+            dst.write(chunk)
+            if on_chunk:
+                on_chunk(len(chunk))
+
+
+# 成员并行压缩：进程数和单个工作进程可占用的内存上限（超过上限的成员在主进程流式压缩）
+COMPRESS_WORKERS = os.cpu_count() or 1
+COMPRESS_MEMORY_BUDGET = 64 * 1024 * 1024
+
+
+def _zip_compressor(compress_type, level):
+    """返回与zipfile写出格式一致的压缩器"""
+    if compress_type == zipfile.ZIP_DEFLATED:
+        return zlib.compressobj(-1 if level is None else level, zlib.DEFLATED, -15)
+    if compress_type == zipfile.ZIP_BZIP2:
+        return bz2.BZ2Compressor(9 if level is None else level)
+    if compress_type == zipfile.ZIP_LZMA:
+        return zipfile.LZMACompressor()
+    raise ValueError(f"不支持的压缩方式: {compress_type}")
+
+
+def compress_member(file_path, compress_type, level):
+    """在工作进程中压缩一个成员，返回(压缩数据, CRC32, 原始大小)"""
+    compressor = _zip_compressor(compress_type, level)
+    parts = []
+    crc = 0
+    file_size = 0
+    with open(file_path, 'rb') as f:
+        for chunk in _read_chunks(f):
+            crc = zlib.crc32(chunk, crc)
+            file_size += len(chunk)
+            parts.append(compressor.compress(chunk))
+    parts.append(compressor.flush())
+    return b"".join(parts), crc, file_size
+
+
+def append_compressed_member(zf, zinfo, compressed, crc, file_size):
+    """把已压缩好的数据作为一个成员追加到ZIP，簿记方式与ZipFile.writestr一致"""
+    zinfo.CRC = crc
+    zinfo.file_size = file_size
+    zinfo.compress_size = len(compressed)
+    zinfo.flag_bits = 0x02 if zinfo.compress_type == zipfile.ZIP_LZMA else 0x00  # LZMA带EOS标记
+    if not zinfo.external_attr:
+        zinfo.external_attr = 0o600 << 16
+    zip64 = file_size > zipfile.ZIP64_LIMIT or len(compressed) > zipfile.ZIP64_LIMIT
+    zinfo.header_offset = zf.fp.tell()
+    zf.fp.write(zinfo.FileHeader(zip64))
+    zf.fp.write(compressed)
+    zf.start_dir = zf.fp.tell()
+    zf.filelist.append(zinfo)
+    zf.NameToInfo[zinfo.filename] = zinfo
+
+
+def write_zip_members(zf, members, workers=COMPRESS_WORKERS, memory_budget=COMPRESS_MEMORY_BUDGET,
+                      progress=None, checkpoint=None):
+    """按顺序写入成员列表[(文件路径, 成员名, 压缩类型, 压缩级别)]，progress(已读字节, 总字节)
+
+    不超过内存上限且需要压缩的成员提前提交到进程池并行压缩，结果仍按原顺序写入；
+    不压缩或过大的成员在当前进程流式写入，期间工作进程继续压缩后面的成员。
+    checkpoint(下一个成员序号)在除最后一个以外的每个成员写完后调用
+    """
+    def parallel(member):
+        file_path, _, compress_type, _ = member
+        return compress_type != zipfile.ZIP_STORED and os.path.getsize(file_path) <= memory_budget
+
+    total = sum(os.path.getsize(member[0]) for member in members)
+    done = 0
+
+    def on_chunk(size):
+        nonlocal done
+        done += size
+        if progress:
+            progress(done, total)
+
+    pool = None
+    if workers > 1 and sum(1 for member in members if parallel(member)) > 1:
+        # 按需导入，避免导入本模块时加载multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(workers)
+    futures = {}
+    next_submit = 0
+    try:
+        for i, (file_path, arcname, compress_type, level) in enumerate(members):
+            # 保持最多workers个成员在压缩中，限制已完成但未写出的结果占用的内存
+            while pool is not None and next_submit < len(members) and len(futures) < workers:
+                if parallel(members[next_submit]):
+                    submit_path, _, submit_type, submit_level = members[next_submit]
+                    futures[next_submit] = pool.submit(compress_member, submit_path, submit_type, submit_level)
+                next_submit += 1
+
+            if i in futures:
+                future = futures.pop(i)
+                while True:
+                    # 等待期间定期回调进度，使取消请求能及时生效
+                    try:
+                        compressed, crc, file_size = future.result(timeout=0.1)
+                        break
+                    except FutureTimeoutError:
+                        on_chunk(0)
+                zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+                zinfo.compress_type = compress_type
+                append_compressed_member(zf, zinfo, compressed, crc, file_size)
+                if checkpoint and i + 1 < len(members):
+                    checkpoint(i + 1)
+                on_chunk(file_size)
+            else:
+                write_zip_member(zf, file_path, arcname, compress_type, level, on_chunk)
+                if checkpoint and i + 1 < len(members):
+                    checkpoint(i + 1)
+    finally:
+        if pool is not None:
+            for future in futures.values():
+                future.cancel()
+            # 正常结束时所有结果都已取回；取消时不等待正在压缩的成员
+            pool.shutdown(wait=False)
+
+
+def _extract_zip_member(stream, dest_dir, name, method, compress_size, crc, on_chunk=None,
+                        checkpoint=None, resume=None):
+    """从当前位置读取一个成员的压缩数据，解压写入目标目录并校验CRC
+
+    不压缩的成员每写入一块调用checkpoint(已写字节, 当前CRC)；resume为(已写字节, CRC)时
+    保留目标文件的前若干字节，从该位置续写（只用于不压缩的成员）
+    """
+    target = _safe_member_path(dest_dir, name)
+    if target is None or name.endswith('/'):
+        if target:
+            os.makedirs(target, exist_ok=True)
+        stream.read(compress_size)
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    decompressor = _zip_decompressor(method)
+    done, actual_crc = resume or (0, 0)
+    remaining = compress_size - done
+    if done:
+        stream.seek(done, os.SEEK_CUR)
+    with open(target, 'r+b' if done else 'wb') as out:
+        out.seek(done)
+        out.truncate()
+        while remaining > 0:
+            chunk = stream.read(min(remaining, SEGMENT_SIZE))
+            if not chunk:
+                raise EpkgFormatError("ZIP数据不完整")
+            remaining -= len(chunk)
+            if on_chunk:
+                on_chunk(len(chunk))
+            data = decompressor.decompress(chunk) if decompressor else chunk
+            actual_crc = zlib.crc32(data, actual_crc)
+            out.write(data)
+            if checkpoint and decompressor is None:
+                checkpoint(compress_size - remaining, actual_crc)
+        if method == zipfile.ZIP_DEFLATED:
+            data = decompressor.flush()
+            actual_crc = zlib.crc32(data, actual_crc)
+            out.write(data)
+    if actual_crc != crc:
+        raise EpkgFormatError(f"成员校验失败: {name}")
+
+
+def extract_indexed_members(reader, entries, dest_dir, progress=None):
+    """按索引定位成员，只解密这些成员所在的分段；progress(已读压缩字节, 总字节)"""
+    total = sum(entry['compress_size'] for entry in entries)
+    done = 0
+
+    def on_chunk(size):
+        nonlocal done
+        done += size
+        if progress:
+            progress(done, total)
+
+    for entry in entries:
+        reader.limit_prefetch(entry['segments'][1] + 1)
+        reader.seek(entry['offset'])
+        raw = reader.read(_ZIP_LOCAL_HEADER.size)
+        if len(raw) < _ZIP_LOCAL_HEADER.size or raw[:4] != _ZIP_LOCAL_SIGNATURE:
+            raise EpkgFormatError(f"索引与数据不一致: {entry['name']}")
+        name_len, extra_len = _ZIP_LOCAL_HEADER.unpack(raw)[-2:]
+        reader.seek(name_len + extra_len, os.SEEK_CUR)
+        _extract_zip_member(reader, dest_dir, entry['name'], entry['compress_type'],
+                            entry['compress_size'], entry['crc'], on_chunk)
+
+
+def commit_staging_dir(staging_dir, dest_dir):
+    """把暂存目录中的内容逐项原子地移动到目标目录，同名目录合并"""
+    for entry in os.listdir(staging_dir):
+        src = os.path.join(staging_dir, entry)
+        dst = os.path.join(dest_dir, entry)
+        if os.path.isdir(src) and os.path.isdir(dst):
+            commit_staging_dir(src, dst)
+            os.rmdir(src)
+        else:
+            os.replace(src, dst)
+
+
+# ===== 断点续传 =====
+# 加密/解密大任务时定期写出检查点日志，中断后用相同参数重新执行即从最后一个检查点继续。
+# 日志只是提示：续传前重新认证已写出的分段、重新计算已解压成员的CRC，对不上就从头开始。
+# 日志统一放在用户目录下只有本人可访问的目录中，不在输出旁留下文件
+CHECKPOINT_INTERVAL = 64 * 1024 * 1024  # 两次检查点之间至少处理的字节数
+JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".epkg-journals")
+_JOURNAL_VERSION = 3
+# 只有取消、中断和I/O错误（磁盘满、设备拔出等）之后保留检查点；认证失败、格式错误等重试也不会成功，直接丢弃
+_RESUMABLE_ERRORS = (OperationCancelled, KeyboardInterrupt, OSError)
+# 续写ZIP时为已写完的成员重建中央目录所需的ZipInfo字段，都是文档中列出的公开属性（文件名、extra和注释另行处理）
+_ZINFO_FIELDS = ('compress_type', 'create_system', 'create_version', 'extract_version', 'reserved',
+                 'flag_bits', 'volume', 'internal_attr', 'external_attr', 'header_offset',
+                 'CRC', 'compress_size', 'file_size')
+
+
+def _zinfo_to_json(zinfo):
+    data = {field: getattr(zinfo, field) for field in _ZINFO_FIELDS}
+    data.update(filename=zinfo.filename, date_time=zinfo.date_time,
+                extra=zinfo.extra.hex(), comment=zinfo.comment.hex())
+    return data
+
+
+def _zinfo_from_json(data):
+    zinfo = zipfile.ZipInfo(data['filename'], tuple(data['date_time']))
+    for field in _ZINFO_FIELDS:
+        setattr(zinfo, field, data[field])
+    zinfo.extra = bytes.fromhex(data['extra'])
+    zinfo.comment = bytes.fromhex(data['comment'])
+    return zinfo
+
+
+def _journal_path(kind, *keys):
+    """日志路径：JOURNAL_DIR/<类型>-<任务键的摘要>.json，任务键为输出位置等能唯一确定任务的字符串"""
+    digest = hashlib.sha256("\0".join(keys).encode('utf-8')).hexdigest()[:32]
+    return os.path.join(JOURNAL_DIR, f"{kind}-{digest}.json")
+
+
+def _write_journal(path, state):
+    """原子地写入日志；加密日志中含有包密钥，日志目录和文件只允许当前用户访问"""
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    tmp_path = path + ".tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_journal(path):
+    """读取日志，不存在或无法识别时返回None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if isinstance(state, dict) and state.get('version') == _JOURNAL_VERSION else None
+
+
+def _remove_files(*paths):
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def _verify_segments(f, header, aes_key, count, workers=1):
+    """重新认证文件中的前count个（非末尾）分段，只检查不保留明文；不完整或被改动时抛出异常"""
+    stride = header['segment_size'] + TAG_SIZE
+    buffers = [bytearray(stride) for _ in range(max(1, min(workers, count)))]
+    executor = ThreadPoolExecutor(len(buffers)) if len(buffers) > 1 else None
+    try:
+        for start in range(0, count, len(buffers)):
+            batch = []
+            for buffer, index in zip(buffers, range(start, min(start + len(buffers), count))):
+                f.seek(header['body_offset'] + index * stride)
+                if f.readinto(buffer) != stride:
+                    raise EpkgFormatError("加密包已被截断")
+                batch.append((aes_key, header['nonce_prefix'], header['aad'], index, memoryview(buffer), False))
+            if executor is None:
+                for args in batch:
+                    _decrypt_segment(*args)
+            else:
+                list(executor.map(lambda args: _decrypt_segment(*args), batch))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def _package_signature(members, wrapped_keys, extra_members):
+    """加密任务的指纹：输入文件（路径、大小、修改时间、压缩方式）、接收方和附加成员，任何一项变化都不能续传"""
+    inputs = []
+    for file_path, arcname, compress_type, level in members:
+        st = os.stat(file_path)
+        inputs.append([os.path.abspath(file_path), arcname, st.st_size, st.st_mtime_ns, compress_type, level])
+    signature = {
+        'segment_size': SEGMENT_SIZE,
+        'recipients': sorted(slot_key_id.hex() for _, slot_key_id, _ in wrapped_keys),
+        'inputs': inputs,
+        'extra': {name: hashlib.sha256(data.encode() if isinstance(data, str) else data).hexdigest()
+                  for name, data in (extra_members or {}).items()},
+    }
+    return hashlib.sha256(json.dumps(signature, sort_keys=True).encode()).hexdigest()
+
+
+class EncryptJournal:
+    """加密包的检查点：已写出的分段数、已写完的ZIP成员的目录信息和下一个成员的序号
+
+    检查点只在成员之间记录：先在ZIP数据中补零到分段边界（成员之间的空隙不影响按中央目录读取），
+    使已写出的内容全部落在完整的加密分段中，日志不保存任何文件内容。
+    输出先写入<输出>.part（只有密文），日志按输出路径存放在JOURNAL_DIR中，完成后.part改名为输出并删除日志。
+    日志中明文保存包密钥（续传必须用同一个密钥）以及已写完成员的名称、大小和CRC，
+    能读取日志的人也能解密.part中已写出的部分，因此日志目录只允许当前用户访问
+    """
+    def __init__(self, out_path, signature):
+        self.part_path = out_path + ".part"
+        self.path = _journal_path('encrypt', os.path.abspath(out_path))
+        self.signature = signature
+        self.aes_key = None
+        self.writer = None
+        self.zf = None
+        self.base_index = 0
+        self._saved_position = 0
+        self._offer = None
+
+    def load(self, workers=1):
+        """读取日志并重新认证.part中已写出的分段，返回可续传的检查点，否则返回None"""
+        state = _read_journal(self.path)
+        if state is None or state.get('signature') != self.signature:
+            return None
+        try:
+            with open(self.part_path, 'rb') as f:
+                header = read_epkg_header(f)
+                if header['aad'].hex() != state['aad']:
+                    return None
+                _verify_segments(f, header, bytes.fromhex(state['key']), state['segments'], workers)
+        except (OSError, ValueError):
+            return None
+        return state
+
+    def reopen(self, dst, state):
+        """截掉检查点之后写出的数据，返回(AES密钥, nonce前缀, AAD)"""
+        header = read_epkg_header(dst)
+        dst.seek(header['body_offset'] + state['segments'] * (header['segment_size'] + TAG_SIZE))
+        dst.truncate()
+        return bytes.fromhex(state['key']), header['nonce_prefix'], header['aad']
+
+    def attach(self, aes_key, writer, zf, state=None):
+        """关联本次的写入器和ZipFile；续传时先恢复检查点中的状态，返回下一个成员的序号
+
+        已写完的成员按append_compressed_member的方式登记到ZipFile，关闭时一起写入中央目录
+        """
+        self.aes_key, self.writer, self.zf = aes_key, writer, zf
+        if state is None:
+            return 0
+        writer.resume(state['segments'])
+        zf.start_dir = writer.position
+        for data in state['members']:
+            zinfo = _zinfo_from_json(data)
+            zf.filelist.append(zinfo)
+            zf.NameToInfo[zinfo.filename] = zinfo
+        self.base_index = state['next']
+        self._saved_position = writer.position
+        return state['next']
+
+    def offer(self, next_index):
+        """write_zip_members的checkpoint回调：距上次检查点足够远时写出新的检查点"""
+        self._offer = (next_index, self.writer.position)
+        if self.writer.position - self._saved_position >= CHECKPOINT_INTERVAL:
+            self._save(next_index)
+
+    def wrap_progress(self, progress):
+        """用户取消时，如果正好停在成员之间，先写出检查点，再中止写入器"""
+        if progress is None:
+            return None
+
+        def wrapped(done, total):
+            try:
+                progress(done, total)
+            except OperationCancelled:
+                if self._offer and self._offer[1] == self.writer.position != self._saved_position:
+                    self._save(self._offer[0])
+                # 之后异常展开时zipfile写出的收尾数据不再进入文件
+                self.writer.abort()
+                raise
+        return wrapped
+
+    def _save(self, next_index):
+        self.writer.align()
+        # 补零之后下一个成员（或中央目录）从分段边界开始
+        self.zf.start_dir = self.writer.position
+        segments = self.writer.sync()
+        _write_journal(self.path, {
+            'version': _JOURNAL_VERSION,
+            'signature': self.signature,
+            'key': self.aes_key.hex(),
+            'aad': self.writer.aad.hex(),
+            'segments': segments,
+            'members': [_zinfo_to_json(zinfo) for zinfo in self.zf.filelist],
+            'next': self.base_index + next_index,
+        })
+        self._saved_position = self.writer.position
+
+    def finish(self, out_path):
+        os.replace(self.part_path, out_path)
+        _remove_files(self.path)
+
+    def discard(self):
+        _remove_files(self.part_path, self.path)
+
+
+def _package_id(epkg_path):
+    """由头部摘要得到加密包的标识，用于定位续传的暂存目录；v1加密包不支持续传，返回None"""
+    with open(epkg_path, 'rb') as f:
+        if read_epkg_version(f) == 1:
+            return None
+        return read_epkg_header(f)['aad'].hex()[:16]
+
+
+def _member_digest(name):
+    """解密日志只记录成员名的摘要，不把包内的文件名写到目标目录之外"""
+    return hashlib.sha256(name.encode('utf-8')).hexdigest()
+
+
+class DecryptJournal:
+    """解密的检查点：已解压完成的成员和写到一半的不压缩成员
+
+    暂存目录固定为<目标目录>/.epkg-resume-<包标识>（须与目标目录在同一文件系统才能原子移入），
+    日志按目标目录和包标识存放在JOURNAL_DIR中，只记录成员名的摘要，完成后都会删除。
+    续传前按认证过的中央目录重新计算每个已完成成员的CRC，写到一半的成员核对已写部分的CRC
+    """
+    def __init__(self, dest_dir, package_id):
+        self.staging_dir = os.path.join(dest_dir, f".epkg-resume-{package_id}")
+        self.path = _journal_path('decrypt', os.path.abspath(dest_dir), package_id)
+        state = _read_journal(self.path)
+        if state is None or not os.path.isdir(self.staging_dir):
+            state = {'version': _JOURNAL_VERSION, 'members': [], 'partial': None}
+        self.completed = set(state['members'])
+        self.partial = state['partial']
+        self.position = 0
+        self._saved_position = 0
+
+    def verified(self, info):
+        """返回True（已完成且校验通过）、(已写字节, CRC)（可续写）或None（需要重新解压）"""
+        target = _safe_member_path(self.staging_dir, info.filename)
+        if target is None or info.filename.endswith('/') or not os.path.isfile(target):
+            return None
+        name = _member_digest(info.filename)
+        if name in self.completed:
+            if os.path.getsize(target) == info.file_size and _file_crc32(target) == info.CRC:
+                return True
+        elif self.partial and self.partial['name'] == name and info.compress_type == zipfile.ZIP_STORED:
+            done = self.partial['done']
+            if os.path.getsize(target) >= done and _file_crc32(target, done) == self.partial['crc']:
+                return done, self.partial['crc']
+        return None
+
+    def offer(self, position, partial=None):
+        """记录进度，距上次检查点足够远时写出日志；partial为(成员名, 已写字节, CRC)"""
+        self.position = position
+        self.partial = None
+        if partial:
+            name, done, crc = partial
+            self.partial = {'name': _member_digest(name), 'done': done, 'crc': crc}
+        if position - self._saved_position >= CHECKPOINT_INTERVAL:
+            self.save()
+
+    def complete(self, name, position):
+        self.completed.add(_member_digest(name))
+        self.offer(position)
+
+    def save(self):
+        _write_journal(self.path, {'version': _JOURNAL_VERSION, 'members': sorted(self.completed),
+                                   'partial': self.partial})
+        self._saved_position = self.position
+
+    def discard(self):
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        _remove_files(self.path)
+
+
+def _file_crc32(path, length=None):
+    """计算文件（或其前length字节）的CRC32"""
+    crc = 0
+    remaining = length
+    with open(path, 'rb') as f:
+        for chunk in _read_chunks(f):
+            if remaining is not None:
+                chunk = chunk[:remaining]
+                remaining -= len(chunk)
+            crc = zlib.crc32(chunk, crc)
+            if remaining == 0:
+                break
+    return crc
+
+
+def extract_zip_resumable(zf, reader, journal):
+    """按成员在包中的顺序解压到日志的暂存目录，跳过校验通过的已完成成员，写到一半的不压缩成员接着写"""
+    for info in sorted(zf.infolist(), key=lambda info: info.header_offset):
+        resume = journal.verified(info)
+        if resume is True:
+            continue
+        reader.seek(info.header_offset)
+        raw = reader.read(_ZIP_LOCAL_HEADER.size)
+        if len(raw) < _ZIP_LOCAL_HEADER.size or raw[:4] != _ZIP_LOCAL_SIGNATURE:
+            raise EpkgFormatError(f"ZIP成员位置错误: {info.filename}")
+        name_len, extra_len = _ZIP_LOCAL_HEADER.unpack(raw)[-2:]
+        reader.seek(name_len + extra_len, os.SEEK_CUR)
+        _extract_zip_member(reader, journal.staging_dir, info.filename, info.compress_type,
+                            info.compress_size, info.CRC,
+                            checkpoint=lambda done, crc, name=info.filename: journal.offer(
+                                reader.tell(), (name, done, crc)),
+                            resume=resume)
+        journal.complete(info.filename, reader.tell())
+
+
+# ===== 高层接口 =====
+RSA_KEY_BITS = 2048
+KEY_CACHE_SIZE = 32
+# 批量解密时同时处理的加密包数
+PACKAGE_JOBS = min(4, os.cpu_count() or 1)
+
+
+def parse_key(pem):
+    """解析PEM格式的密钥，自动识别RSA或ECC"""
+    try:
+        return RSA.import_key(pem)
+    except ValueError:
+        pass
+    try:
+        return ECC.import_key(pem)
+    except ValueError:
+        raise ValueError("无法识别的密钥格式，需要RSA或ECC的PEM密钥")
+
+
+class KeyCache:
+    """已解析密钥的LRU缓存，以PEM的SHA-256指纹为键，线程安全
+
+    解析PEM并校验2048位私钥的开销不小，同一把密钥重复使用时直接返回缓存的密钥对象
+    """
+    def __init__(self, capacity=KEY_CACHE_SIZE):
+        self.capacity = capacity
+        self._keys = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(pem):
+        """PEM去掉首尾空白后的SHA-256十六进制指纹"""
+        if isinstance(pem, str):
+            pem = pem.encode()
+        return hashlib.sha256(pem.strip()).hexdigest()
+
+    def import_key(self, pem):
+        """返回解析后的密钥对象，已缓存时不再解析"""
+        if isinstance(pem, (RSA.RsaKey, ECC.EccKey)):
+            return pem
+        fingerprint = self.fingerprint(pem)
+        with self._lock:
+            key = self._keys.get(fingerprint)
+            if key is not None:
+                self._keys.move_to_end(fingerprint)
+                return key
+        # 在锁外解析，其他线程不必等待
+        key = parse_key(pem)
+        with self._lock:
+            self._keys[fingerprint] = key
+            self._keys.move_to_end(fingerprint)
+            while len(self._keys) > self.capacity:
+                self._keys.popitem(last=False)
+        return key
+
+    def discard(self, fingerprint):
+        """移除指定指纹的缓存项（密钥文本被修改时调用）"""
+        with self._lock:
+            self._keys.pop(fingerprint, None)
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+    def __len__(self):
+        return len(self._keys)
+
+
+key_cache = KeyCache()
+
+
+def import_key(pem):
+    """解析PEM格式的RSA或ECC密钥，经过key_cache缓存"""
+    return key_cache.import_key(pem)
+
+
+def generate_keypair(bits=RSA_KEY_BITS, curve=None):
+    """生成密钥对，返回(私钥PEM, 公钥PEM)；指定curve(如'P-256')时生成ECC密钥，忽略bits"""
+    if curve:
+        key = ECC.generate(curve=curve)
+        return key.export_key(format='PEM'), key.public_key().export_key(format='PEM')
+    key = RSA.generate(bits)
+    return key.export_key().decode(), key.publickey().export_key().decode()
+
+
+KEY_POOL_SIZE = 2
+
+
+class KeyPairPool:
+    """在后台线程中预先生成RSA密钥对，取用时不必等待
+
+    密钥对只保存在内存队列中，从不写入磁盘；每取走一对，后台线程就补充一对
+    """
+    def __init__(self, size=KEY_POOL_SIZE, bits=RSA_KEY_BITS, curve=None):
+        self.size = size
+        self.bits = bits
+        self.curve = curve
+        self._pairs = queue.Queue(maxsize=max(size, 1))
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None and self.size > 0:
+            self._thread = threading.Thread(target=self._fill, daemon=True)
+            self._thread.start()
+        return self
+
+    def _fill(self):
+        while not self._stop_event.is_set():
+            pair = generate_keypair(self.bits, self.curve)
+            # 队列满时阻塞等待取用，定期检查是否已停止
+            while not self._stop_event.is_set():
+                try:
+                    self._pairs.put(pair, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            # stop()可能在生成或放入期间清空了队列，放入后再检查一次，不让密钥留在已停止的池中
+            if self._stop_event.is_set():
+                self._drain()
+
+    def ready(self):
+        """池中现成的密钥对数量"""
+        return self._pairs.qsize()
+
+    def take(self):
+        """取一对密钥(私钥PEM, 公钥PEM)；池为空时在当前线程直接生成"""
+        try:
+            return self._pairs.get_nowait()
+        except queue.Empty:
+            return generate_keypair(self.bits, self.curve)
+
+    def stop(self):
+        """停止后台生成并丢弃池中尚未取用的密钥"""
+        self._stop_event.set()
+        self._drain()
+
+    def _drain(self):
+        while True:
+            try:
+                self._pairs.get_nowait()
+            except queue.Empty:
+                break
+
+
+_PEM_BLOCK = re.compile(r"-----BEGIN ([A-Z0-9 ]+)-----.+?-----END \1-----", re.S)
+
+
+def split_pem_blocks(text):
+    """把包含多个PEM块的文本拆开；没有PEM块时原样返回整段文本"""
+    return [match.group(0) for match in _PEM_BLOCK.finditer(text)] or [text.strip()]
+
+
+def load_private_keys(private_keys):
+    """把私钥PEM文本（可以连续粘贴多把私钥）、PEM/密钥对象列表转为按密钥ID索引的PrivateKeySet"""
+    if isinstance(private_keys, PrivateKeySet):
+        return private_keys
+    if isinstance(private_keys, str):
+        private_keys = split_pem_blocks(private_keys)
+    elif not isinstance(private_keys, (list, tuple)):
+        private_keys = [private_keys]
+    keys = [import_key(pem) for pem in private_keys]
+    if not any(key.has_private() for key in keys):
+        raise ValueError("没有找到私钥")
+    return PrivateKeySet(key for key in keys if key.has_private())
+
+
+def public_key_from_private(private_key_pem):
+    """从私钥PEM派生公钥PEM"""
+    return export_public_pem(import_key(private_key_pem))
+
+
+def export_public_pem(key):
+    """导出密钥对象的公钥PEM"""
+    if isinstance(key, ECC.EccKey):
+        return key.public_key().export_key(format='PEM')
+    return key.publickey().export_key().decode()
+
+
+def key_fingerprint(key):
+    """公钥指纹：DER编码的SubjectPublicKeyInfo的SHA-256十六进制"""
+    return hashlib.sha256(_public_der(key)).hexdigest()
+
+
+# ===== 接收方密钥环 =====
+DEFAULT_KEYRING_PATH = os.path.join(os.path.expanduser("~"), ".epkg-keyring.json")
+_KEYRING_VERSION = 1
+
+
+class KeyringError(ValueError):
+    """密钥环中找不到或冲突的名称、指纹、分组"""
+
+
+def _load_public_der(key_type, der):
+    """从加入密钥环时已校验过的DER构造公钥对象，RSA跳过一致性检查"""
+    if key_type == 'ecc':
+        return ECC.import_key(der)
+    spki = DerSequence().decode(der)
+    n, e = DerSequence().decode(DerBitString().decode(spki[1]).value)
+    return RSA.construct((n, e), consistency_check=False)
+
+
+class Keyring:
+    """保存在磁盘上的接收方公钥环，按指纹和名称索引，支持命名分组，线程安全
+
+    公钥以校验过的DER保存；加载只解析JSON，公钥对象在第一次使用时才构造并缓存
+    """
+    def __init__(self, path=DEFAULT_KEYRING_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._entries = {}  # 指纹 -> {'name', 'type', 'der'}
+        self._names = {}    # 名称 -> 指纹
+        self._groups = {}   # 分组名 -> [指纹]
+        self._keys = {}     # 指纹 -> 公钥对象
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != _KEYRING_VERSION:
+            raise KeyringError(f"不支持的密钥环版本: {data.get('version')}")
+        for fingerprint, entry in data['keys'].items():
+            self._entries[fingerprint] = {'name': entry['name'], 'type': entry['type'],
+                                          'der': base64.b64decode(entry['der'])}
+            self._names[entry['name']] = fingerprint
+        self._groups = {name: list(members) for name, members in data.get('groups', {}).items()}
+
+    def save(self):
+        """写入临时文件后替换，避免写到一半留下损坏的密钥环"""
+        with self._lock:
+            data = {
+                'version': _KEYRING_VERSION,
+                'keys': {fingerprint: {'name': entry['name'], 'type': entry['type'],
+                                       'der': base64.b64encode(entry['der']).decode()}
+                         for fingerprint, entry in self._entries.items()},
+                'groups': self._groups,
+            }
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+
+    def add(self, name, pem):
+        """校验并加入一把公钥（给出私钥时只保存公钥部分），返回指纹"""
+        key = _public_part(parse_key(pem))
+        fingerprint = key_fingerprint(key)
+        with self._lock:
+            if self._names.get(name, fingerprint) != fingerprint:
+                raise KeyringError(f"名称已被其他公钥使用: {name}")
+            existing = self._entries.get(fingerprint)
+            if existing is not None and existing['name'] != name:
+                raise KeyringError(f"该公钥已以名称 {existing['name']} 存在")
+            self._entries[fingerprint] = {'name': name,
+                                          'type': 'ecc' if isinstance(key, ECC.EccKey) else 'rsa',
+                                          'der': key.export_key(format='DER')}
+            self._names[name] = fingerprint
+            self._keys[fingerprint] = key
+        return fingerprint
+
+    def resolve(self, ref):
+        """名称、完整指纹或唯一的指纹前缀（至少8位）-> 指纹"""
+        with self._lock:
+            if ref in self._names:
+                return self._names[ref]
+            if ref in self._entries:
+                return ref
+            if len(ref) >= 8:
+                matches = [fingerprint for fingerprint in self._entries if fingerprint.startswith(ref)]
+                if len(matches) == 1:
+                    return matches[0]
+        raise KeyringError(f"密钥环中没有该公钥: {ref}")
+
+    def remove(self, ref):
+        """删除公钥，并从所有分组中移除"""
+        with self._lock:
+            fingerprint = self.resolve(ref)
+            entry = self._entries.pop(fingerprint)
+            del self._names[entry['name']]
+            self._keys.pop(fingerprint, None)
+            for members in self._groups.values():
+                if fingerprint in members:
+                    members.remove(fingerprint)
+
+    def entries(self):
+        """[{'fingerprint', 'name', 'type'}]，按名称排序"""
+        with self._lock:
+            return sorted(({'fingerprint': fingerprint, 'name': entry['name'], 'type': entry['type']}
+                           for fingerprint, entry in self._entries.items()), key=lambda e: e['name'])
+
+    def groups(self):
+        """{分组名: [指纹]}"""
+        with self._lock:
+            return {name: list(members) for name, members in self._groups.items()}
+
+    def set_group(self, name, refs):
+        """创建或替换分组，成员可以是名称或指纹"""
+        with self._lock:
+            members = []
+            for ref in refs:
+                fingerprint = self.resolve(ref)
+                if fingerprint not in members:
+                    members.append(fingerprint)
+            self._groups[name] = members
+
+    def remove_group(self, name):
+        with self._lock:
+            if self._groups.pop(name, None) is None:
+                raise KeyringError(f"没有该分组: {name}")
+
+    def public_key(self, ref):
+        """返回公钥对象，可直接传给encrypt_message/encrypt_package"""
+        with self._lock:
+            fingerprint = self.resolve(ref)
+            key = self._keys.get(fingerprint)
+            if key is None:
+                entry = self._entries[fingerprint]
+                key = self._keys[fingerprint] = _load_public_der(entry['type'], entry['der'])
+            return key
+
+    def group_keys(self, name):
+        """返回分组中所有成员的公钥对象"""
+        with self._lock:
+            if name not in self._groups:
+                raise KeyringError(f"没有该分组: {name}")
+            return [self.public_key(fingerprint) for fingerprint in self._groups[name]]
+
+
+def wrap_package_key(aes_key, public_keys):
+    """为每个接收方公钥（RSA或ECC）封装AES密钥，返回密钥槽列表"""
+    wrapped_keys = []
+    for i, public_key_pem in enumerate(public_keys):
+        try:
+            wrapped_keys.append(wrap_key(aes_key, import_key(public_key_pem)))
+        except Exception as e:
+            raise ValueError(f"为接收方 {i+1} 加密失败: {str(e)}")
+    return wrapped_keys
+
+
+def encrypt_message(message, public_key_pem):
+    """用接收方公钥加密文本消息，返回Base64文本
+
+    格式与加密包相同：头部中一个带接收方密钥ID的密钥槽，正文按分段AES-GCM加密，
+    无论消息多长都只做一次公钥运算
+    """
+    if isinstance(message, str):
+        message = message.encode()
+    aes_key = secrets.token_bytes(AES_KEY_SIZE)
+    nonce_prefix = secrets.token_bytes(NONCE_PREFIX_SIZE)
+    buf = io.BytesIO()
+    aad = write_epkg_header(buf, nonce_prefix, wrap_package_key(aes_key, [public_key_pem]))
+    writer = SegmentWriter(buf, aes_key, nonce_prefix, aad)
+    writer.write(message)
+    writer.close()
+    return base64.urlsafe_b64encode(buf.getvalue()).decode()
+
+
+def _decrypt_legacy_chunks(privkey, chunks):
+    """解密一批旧格式分块，每批使用自己的密码对象"""
+    cipher_rsa = PKCS1_OAEP.new(privkey)
+    return [cipher_rsa.decrypt(chunk) for chunk in chunks]
+
+
+def _select_rsa_key(privkeys, ciphertext, what):
+    """旧格式没有密钥ID：只有一把RSA私钥时直接使用，否则用一段密文逐个试解"""
+    keys = privkeys.rsa_keys(what)
+    for privkey in keys[:-1]:
+        try:
+            PKCS1_OAEP.new(privkey).decrypt(ciphertext)
+            return privkey
+        except ValueError:
+            pass
+    return keys[-1]
+
+
+def _decrypt_legacy_message(token, privkeys, progress=None, workers=1):
+    """解密旧格式消息：每块单独RSA加密，Base64后以"::"连接
+
+    RSA私钥运算在pycryptodome中会释放GIL，分块按批次分给线程池并行解密
+    """
+    encrypted_chunks = [base64.urlsafe_b64decode(chunk) for chunk in token.split("::")]
+    privkey = _select_rsa_key(privkeys, encrypted_chunks[0], "旧格式消息")
+    total = len(encrypted_chunks)
+    workers = max(1, min(workers, total))
+    # 批次数多于线程数，使进度更平滑
+    batch_size = -(-total // (workers * 4))
+    batches = [encrypted_chunks[i:i + batch_size] for i in range(0, total, batch_size)]
+
+    parts = []
+    executor = ThreadPoolExecutor(workers) if workers > 1 else None
+    try:
+        if executor is None:
+            results = (_decrypt_legacy_chunks(privkey, batch) for batch in batches)
+        else:
+            futures = [executor.submit(_decrypt_legacy_chunks, privkey, batch) for batch in batches]
+            results = (future.result() for future in futures)
+        for decrypted in results:
+            parts.extend(decrypted)
+            if progress:
+                progress(len(parts), total)
+    finally:
+        if executor is not None:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+    return b"".join(parts)
+
+
+def _decrypt_message(token, privkeys, progress=None, workers=1):
+    """用已导入的私钥集合解密一条消息"""
+    token = token.strip()
+    data = base64.urlsafe_b64decode(token) if "::" not in token else b""
+    if not data.startswith(EPKG_MAGIC):
+        return _decrypt_legacy_message(token, privkeys, progress, workers).decode()
+
+    buf = io.BytesIO(data)
+    header = read_epkg_header(buf)
+    aes_key = unwrap_epkg_key(header, privkeys)
+    reader = SegmentReader(buf, header, aes_key, len(data) - header['body_offset'], progress)
+    try:
+        plaintext = reader.read()
+        reader.verify_end()
+        return plaintext.decode()
+    finally:
+        reader.close()
+
+
+def decrypt_message(token, private_keys, progress=None, workers=CRYPTO_WORKERS):
+    """用私钥解密消息，返回文本；兼容旧的"::"分块格式
+
+    private_keys可以是一把或多把私钥（见load_private_keys），按消息头部的密钥ID选择私钥
+    """
+    return _decrypt_message(token, load_private_keys(private_keys), progress, workers)
+
+
+def decrypt_messages(tokens, private_keys, progress=None, workers=CRYPTO_WORKERS):
+    """批量解密消息，私钥只导入一次，消息之间并行；返回[(明文, 异常)]，成功时异常为None"""
+    privkeys = load_private_keys(private_keys)
+
+    def decrypt_one(token):
+        try:
+            return _decrypt_message(token, privkeys), None
+        except (ValueError, TypeError, IndexError) as e:
+            return None, e
+
+    results = []
+    executor = ThreadPoolExecutor(workers) if workers > 1 and len(tokens) > 1 else None
+    try:
+        if executor is None:
+            pending = (decrypt_one(token) for token in tokens)
+        else:
+            futures = [executor.submit(decrypt_one, token) for token in tokens]
+            pending = (future.result() for future in futures)
+        for result in pending:
+            results.append(result)
+            if progress:
+                progress(len(results), len(tokens))
+    finally:
+        if executor is not None:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+    return results
+
+
+def encrypt_package(paths, public_keys, out_path, codec='auto', level=DEFAULT_COMPRESSION_LEVEL,
+                    crypto_workers=CRYPTO_WORKERS, compress_workers=COMPRESS_WORKERS,
+                    memory_budget=COMPRESS_MEMORY_BUDGET, progress=None, arcnames=None, extra_members=None,
+                    resume=False):
+    """把文件列表压缩加密为一个.epkg，所有接收方共用；明文不落盘，失败时删除不完整的输出
+
+    arcnames为各文件在包中的路径，默认取文件名；extra_members为{成员名: bytes}，写在所有文件之前。
+    resume=True时定期写出检查点（见EncryptJournal），取消、中断或I/O错误时保留.part和日志，
+    用相同参数再次调用即从检查点继续
+    """
+    aes_key = secrets.token_bytes(AES_KEY_SIZE)
+    nonce_prefix = secrets.token_bytes(NONCE_PREFIX_SIZE)
+    wrapped_keys = wrap_package_key(aes_key, public_keys)
+    members = []
+    for i, file_path in enumerate(paths):
+        compress_type, member_level = choose_compression(file_path, codec, level)
+        arcname = arcnames[i] if arcnames else os.path.basename(file_path)
+        members.append((file_path, arcname, compress_type, member_level))
+
+    journal = state = None
+    if resume:
+        journal = EncryptJournal(out_path, _package_signature(members, wrapped_keys, extra_members))
+        state = journal.load(crypto_workers)
+        if state is None:
+            journal.discard()
+    target_path = journal.part_path if journal else out_path
+
+    writer = None
+    try:
+        with open(target_path, 'r+b' if state else 'wb') as dst:
+            if state:
+                aes_key, nonce_prefix, aad = journal.reopen(dst, state)
+            else:
+                aad = write_epkg_header(dst, nonce_prefix, wrapped_keys, flags=EPKG_FLAG_INDEX)
+            writer = SegmentWriter(dst, aes_key, nonce_prefix, aad, workers=crypto_workers)
+            # SegmentWriter不可seek，zipfile会改用数据描述符流式写出
+            with zipfile.ZipFile(writer, 'w', zipfile.ZIP_DEFLATED) as zf:
+                start = 0
+                if journal:
+                    start = journal.attach(aes_key, writer, zf, state)
+                    progress = journal.wrap_progress(progress)
+                if not state:
+                    for name, data in (extra_members or {}).items():
+                        zf.writestr(name, data)
+                write_zip_members(zf, members[start:], compress_workers, memory_budget, progress,
+                                  checkpoint=journal.offer if journal else None)
+            writer.close()
+            # 追加加密的成员索引，供列出内容和选择性提取使用
+            write_epkg_index(dst, aes_key, nonce_prefix, aad, build_epkg_index(zf))
+        if journal:
+            journal.finish(out_path)
+    except BaseException as e:
+        if writer is not None:
+            writer.abort()
+        if journal is None:
+            _remove_files(out_path)
+        elif not isinstance(e, _RESUMABLE_ERRORS) or not os.path.exists(journal.path):
+            # 不可重试的错误，或还没有写出过检查点，.part无法续传
+            journal.discard()
+        raise
+
+
+def _require_package(header):
+    if header['flags'] & EPKG_FLAG_RAW:
+        raise EpkgFormatError("这是单文件加密文件(.enc)，请使用单文件解密")
+
+
+def encrypt_file(src_path, public_keys, out_path=None, workers=CRYPTO_WORKERS, progress=None):
+    """单文件加密：不打包不压缩，文件内容直接分段加密写入<文件名>.enc，返回输出路径
+
+    与加密包使用同样的头部（带接收方密钥ID的密钥槽）和分段AES-GCM，内存占用与文件大小无关；
+    失败时删除不完整的输出
+    """
+    out_path = out_path or src_path + ".enc"
+    aes_key = secrets.token_bytes(AES_KEY_SIZE)
+    nonce_prefix = secrets.token_bytes(NONCE_PREFIX_SIZE)
+    wrapped_keys = wrap_package_key(aes_key, public_keys)
+    total = os.path.getsize(src_path)
+
+    completed = False
+    writer = None
+    try:
+        with open(src_path, 'rb') as src, open(out_path, 'wb') as dst:
+            aad = write_epkg_header(dst, nonce_prefix, wrapped_keys, flags=EPKG_FLAG_RAW)
+            writer = SegmentWriter(dst, aes_key, nonce_prefix, aad, workers=workers)
+            done = 0
+            for chunk in _read_chunks(src):
+                writer.write(chunk)
+                done += len(chunk)
+                if progress:
+                    progress(done, total)
+            writer.close()
+        completed = True
+    finally:
+        if not completed:
+            if writer is not None:
+                writer.abort()
+            try:
+                os.unlink(out_path)
+            except OSError:
+                pass
+    return out_path
+
+
+def _decrypted_file_path(enc_path):
+    """去掉.enc后缀；没有该后缀时追加.dec"""
+    root, ext = os.path.splitext(enc_path)
+    return root if ext.lower() == ".enc" else enc_path + ".dec"
+
+
+def _decrypt_legacy_file(f, privkeys, out):
+    """旧版.enc：整个文件直接做RSA-OAEP加密，只能容纳很小的文件"""
+    data = f.read()
+    privkey = _select_rsa_key(privkeys, data, "旧版.enc文件")
+    out.write(PKCS1_OAEP.new(privkey).decrypt(data))
+
+
+def decrypt_file(enc_path, private_keys, out_path=None, workers=CRYPTO_WORKERS, progress=None):
+    """解密单文件加密的.enc，返回输出路径
+
+    先写入同目录下的临时文件，末段认证通过后才替换为目标文件；兼容旧版整文件RSA加密的.enc
+    """
+    privkeys = load_private_keys(private_keys)
+    out_path = out_path or _decrypted_file_path(enc_path)
+    file_size = os.path.getsize(enc_path)
+    fd, tmp_path = tempfile.mkstemp(prefix=".epkg-", suffix=".part", dir=os.path.dirname(os.path.abspath(out_path)))
+    try:
+        with open(enc_path, 'rb') as f, os.fdopen(fd, 'wb') as out:
+            if read_epkg_version(f) == 1:
+                _decrypt_legacy_file(f, privkeys, out)
+            else:
+                header = read_epkg_header(f)
+                if not header['flags'] & EPKG_FLAG_RAW:
+                    raise EpkgFormatError("这是加密包(.epkg)，请使用加密包解密")
+                aes_key = unwrap_epkg_key(header, privkeys)
+                reader = SegmentReader(f, header, aes_key, file_size - header['body_offset'], progress,
+                                       workers=workers)
+                try:
+                    reader.copy_to(out)
+                finally:
+                    reader.close()
+        os.replace(tmp_path, out_path)
+    finally:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+    return out_path
+
+
+def _iter_decrypted_v1(f, privkeys, progress, file_size):
+    """流式解密v1加密包，全部数据读完后校验tag"""
+    # 读取加密的AES信息长度
+    aes_info_len = int.from_bytes(f.read(4), 'big')
+    # 读取加密的AES信息
+    encrypted_aes_info = f.read(aes_info_len)
+    privkey = _select_rsa_key(privkeys, encrypted_aes_info, "v1加密包")
+    aes_info = PKCS1_OAEP.new(privkey).decrypt(encrypted_aes_info)
+    aes_key = aes_info[:32]
+    nonce = aes_info[32:48]
+    tag = aes_info[48:64]
+
+    cipher_aes = AES.new(aes_key, AES.MODE_GCM, nonce=nonce)
+    while True:
+        chunk = f.read(SEGMENT_SIZE)
+        if not chunk:
+            break
+        yield cipher_aes.decrypt(chunk)
+        if progress:
+            progress(f.tell(), file_size)
+    cipher_aes.verify(tag)
+
+
+def _decrypt_package_to(epkg_path, privkeys, staging_dir, workers, progress, journal=None):
+    """解密整个加密包并解压到暂存目录；给出journal时解压到其暂存目录并记录检查点"""
+    file_size = os.path.getsize(epkg_path)
+    with open(epkg_path, 'rb') as f:
+        if read_epkg_version(f) == 1:
+            # v1的tag在头部，读完全部数据后才能校验
+            stream = ChunkReader(_iter_decrypted_v1(f, privkeys, progress, file_size))
+            extract_zip_stream(stream, staging_dir)
+            stream.drain()
+        else:
+            # v2每个分段独立认证，按需解密
+            header = read_epkg_header(f)
+            _require_package(header)
+            aes_key = unwrap_epkg_key(header, privkeys)
+            body_length = epkg_body_length(f, header, file_size)
+            reader = SegmentReader(f, header, aes_key, body_length, progress, workers=workers)
+            try:
+                with zipfile.ZipFile(reader) as zf:
+                    if journal is not None:
+                        extract_zip_resumable(zf, reader, journal)
+                    else:
+                        for info in sorted(zf.infolist(), key=lambda info: info.header_offset):
+                            zf.extract(info, staging_dir)
+            finally:
+                reader.close()
+
+
+def decrypt_package(epkg_path, private_keys, dest_dir, workers=CRYPTO_WORKERS, progress=None, resume=False):
+    """解密.epkg并解压到目标目录；全部认证通过后才移入目标目录
+
+    resume=True时解压到固定的暂存目录并定期写出检查点（见DecryptJournal），取消、中断或I/O错误时保留，
+    再次解密同一个包到同一目录即从检查点继续；v1加密包不支持续传
+    """
+    privkeys = load_private_keys(private_keys)
+    package_id = _package_id(epkg_path) if resume else None
+    if package_id is not None:
+        journal = DecryptJournal(dest_dir, package_id)
+        os.makedirs(journal.staging_dir, exist_ok=True)
+        try:
+            _decrypt_package_to(epkg_path, privkeys, journal.staging_dir, workers, progress, journal)
+        except _RESUMABLE_ERRORS:
+            if os.listdir(journal.staging_dir):
+                journal.save()
+            else:
+                journal.discard()
+            raise
+        except BaseException:
+            # 认证失败或格式错误：已解压的内容不可信，重试也不会成功
+            journal.discard()
+            raise
+        commit_staging_dir(journal.staging_dir, dest_dir)
+        journal.discard()
+        return
+
+    staging_dir = tempfile.mkdtemp(prefix=".epkg-staging-", dir=dest_dir)
+    try:
+        _decrypt_package_to(epkg_path, privkeys, staging_dir, workers, progress)
+        commit_staging_dir(staging_dir, dest_dir)
+    finally:
+        # 清理暂存目录，未通过认证的数据不会留下
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def open_package_index(epkg_path, private_keys):
+    """只解密成员索引，返回(头部, AES密钥, 成员列表)"""
+    privkeys = load_private_keys(private_keys)
+    file_size = os.path.getsize(epkg_path)
+    with open(epkg_path, 'rb') as f:
+        if read_epkg_version(f) == 1:
+            raise EpkgFormatError("旧版本(v1)加密包不包含成员索引，请使用完整解密")
+        header = read_epkg_header(f)
+        _require_package(header)
+        aes_key = unwrap_epkg_key(header, privkeys)
+        entries = read_epkg_index(f, header, aes_key, file_size)
+    return header, aes_key, entries
+
+
+def extract_package_members(epkg_path, header, aes_key, entries, dest_dir,
+                            workers=CRYPTO_WORKERS, progress=None):
+    """按open_package_index返回的成员列表只解密并提取选中的成员"""
+    staging_dir = tempfile.mkdtemp(prefix=".epkg-staging-", dir=dest_dir)
+    try:
+        file_size = os.path.getsize(epkg_path)
+        with open(epkg_path, 'rb') as f:
+            body_length = epkg_body_length(f, header, file_size)
+            reader = SegmentReader(f, header, aes_key, body_length, workers=workers)
+            try:
+                extract_indexed_members(reader, entries, dest_dir=staging_dir, progress=progress)
+            finally:
+                reader.close()
+        commit_staging_dir(staging_dir, dest_dir)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def list_epkg_files(paths):
+    """展开输入：目录取其中所有.epkg文件（按名称排序），文件原样保留"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.lower().endswith(".epkg") and os.path.isfile(os.path.join(path, name))))
+        else:
+            files.append(path)
+    return files
+
+
+def _package_output_dir(dest_dir, epkg_path, used):
+    """每个加密包解压到以包名命名的子目录，同名时追加序号"""
+    stem = os.path.splitext(os.path.basename(epkg_path))[0] or "package"
+    name, n = stem, 1
+    while name in used:
+        n += 1
+        name = f"{stem} ({n})"
+    used.add(name)
+    return os.path.join(dest_dir, name)
+
+
+def decrypt_packages(epkg_paths, private_keys, dest_dir, jobs=PACKAGE_JOBS, workers=1, progress=None,
+                     resume=False):
+    """批量解密加密包，每个包解压到dest_dir下以包名命名的子目录
+
+    私钥只导入一次；最多jobs个包同时解密，workers为单个包内的分段解密线程数。
+    单个包失败不影响其他包，返回每个包的记录
+    {'input', 'output', 'status': 'ok'|'error', 'error', 'bytes', 'seconds'}；
+    progress(已处理字节, 总字节)汇总所有包，回调抛出的异常（如OperationCancelled）会中止整批；
+    resume见decrypt_package
+    """
+    privkeys = load_private_keys(private_keys)
+    used = set()
+    plan = [(path, _package_output_dir(dest_dir, path, used)) for path in epkg_paths]
+    sizes = {path: os.path.getsize(path) if os.path.isfile(path) else 0 for path in epkg_paths}
+    total = sum(sizes.values())
+    done = {}
+    lock = threading.Lock()
+
+    def report(path, n):
+        with lock:
+            done[path] = n
+            completed = sum(done.values())
+        if progress:
+            progress(completed, total)
+
+    def decrypt_one(path, out_dir):
+        record = {'input': path, 'output': out_dir, 'bytes': sizes[path]}
+        start = time.perf_counter()
+        try:
+            os.makedirs(out_dir, exist_ok=True)
+            # 单个包的进度是明文字节，按比例换算成与汇总总量一致的文件字节
+            decrypt_package(path, privkeys, out_dir, workers=workers,
+                            progress=lambda n, package_total: report(path, sizes[path] * n // max(1, package_total)),
+                            resume=resume)
+            record['status'] = 'ok'
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            record['status'] = 'error'
+            record['error'] = str(e)
+            # 不留下失败包的空目录
+            try:
+                os.rmdir(out_dir)
+            except OSError:
+                pass
+        record['seconds'] = round(time.perf_counter() - start, 4)
+        report(path, sizes[path])
+        return record
+
+    executor = ThreadPoolExecutor(max(1, jobs))
+    futures = [executor.submit(decrypt_one, path, out_dir) for path, out_dir in plan]
+    try:
+        return [future.result() for future in futures]
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+# ===== 增量打包 =====
+# 发送方在本地清单中记录每个成员的大小、修改时间和内容哈希；增量包只包含变化的成员，
+# 并在包内附带说明文件，记录删除的成员和清单的代数，接收方按代数顺序叠加到上一次的解压目录
+DELTA_INFO_NAME = ".epkg-delta.json"
+_MANIFEST_VERSION = 1
+MANIFEST_DIR = os.path.join(os.path.expanduser("~"), ".epkg-manifests")
+
+
+def default_manifest_path(root):
+    """按目录绝对路径为每个源目录分配一个清单文件"""
+    digest = hashlib.sha256(os.path.abspath(root).encode()).hexdigest()[:16]
+    return os.path.join(MANIFEST_DIR, f"{os.path.basename(os.path.abspath(root))}-{digest}.json")
+
+
+def load_manifest(path):
+    """读取清单，不存在时返回None"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != _MANIFEST_VERSION:
+        raise ValueError(f"不支持的清单版本: {manifest.get('version')}")
+    return manifest
+
+
+def save_manifest(path, manifest):
+    """写入临时文件后替换，避免中途失败留下损坏的清单"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in _read_chunks(f):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_tree(root):
+    """{相对路径(以/分隔): (大小, 修改时间ns)}，只做stat不读内容"""
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            st = os.stat(path)
+            files[os.path.relpath(path, root).replace(os.sep, '/')] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+def diff_tree(root, manifest):
+    """对比目录与清单，返回(变化的成员, 删除的成员, 新清单成员表)
+
+    大小和修改时间都没变的文件直接沿用清单中的哈希，不读取内容；
+    其余文件计算哈希，只改了修改时间而内容相同的不算变化
+    """
+    previous = manifest['members'] if manifest else {}
+    changed, members = [], {}
+    for relpath, (size, mtime_ns) in sorted(scan_tree(root).items()):
+        old = previous.get(relpath)
+        if old and old['size'] == size and old['mtime_ns'] == mtime_ns:
+            members[relpath] = old
+            continue
+        sha256 = _file_sha256(os.path.join(root, *relpath.split('/')))
+        members[relpath] = {'size': size, 'mtime_ns': mtime_ns, 'sha256': sha256}
+        if not old or old['sha256'] != sha256:
+            changed.append(relpath)
+    deleted = sorted(set(previous) - set(members))
+    return changed, deleted, members
+
+
+def encrypt_delta_package(root, public_keys, out_path, manifest_path=None, codec='auto',
+                          level=DEFAULT_COMPRESSION_LEVEL, crypto_workers=CRYPTO_WORKERS,
+                          compress_workers=COMPRESS_WORKERS, memory_budget=COMPRESS_MEMORY_BUDGET,
+                          progress=None):
+    """把目录自上次以来的变化打成增量包；第一次运行（没有清单）时包含全部文件
+
+    返回{'output', 'generation', 'changed', 'deleted', 'unchanged'}；没有任何变化时不生成包，
+    output为None，只刷新清单中文件的大小和修改时间。有变化时清单只在加密包完整写出后才更新
+    """
+    manifest_path = manifest_path or default_manifest_path(root)
+    manifest = load_manifest(manifest_path)
+    changed, deleted, members = diff_tree(root, manifest)
+    summary = {'output': None, 'generation': manifest['generation'] if manifest else 0,
+               'changed': len(changed), 'deleted': len(deleted), 'unchanged': len(members) - len(changed)}
+    if manifest and not changed and not deleted:
+        # 内容未变但修改时间变了（touch、重新检出）的文件也要记下新的大小和时间，下次才不必重新计算摘要
+        if members != manifest['members']:
+            save_manifest(manifest_path, dict(manifest, members=members))
+        return summary
+
+    manifest_id = manifest['id'] if manifest else secrets.token_hex(8)
+    generation = summary['generation'] + 1
+    info = {
+        'manifest_id': manifest_id,
+        'base_generation': manifest['generation'] if manifest else None,
+        'generation': generation,
+        'deleted': deleted,
+    }
+    encrypt_package([os.path.join(root, *relpath.split('/')) for relpath in changed], public_keys, out_path,
+                    codec, level, crypto_workers, compress_workers, memory_budget, progress,
+                    arcnames=changed, extra_members={DELTA_INFO_NAME: json.dumps(info, ensure_ascii=False)})
+    save_manifest(manifest_path, {'version': _MANIFEST_VERSION, 'id': manifest_id,
+                                  'generation': generation, 'root': os.path.abspath(root), 'members': members})
+    summary.update(output=out_path, generation=generation)
+    return summary
+
+
+def _read_delta_info(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def apply_delta_package(epkg_path, private_keys, dest_dir, workers=CRYPTO_WORKERS, progress=None):
+    """把增量包叠加到上一次的解压目录：写入变化的成员并删除已删除的成员
+
+    目标目录中的说明文件记录已应用到第几代，跳过或重复应用某个增量包时拒绝执行；
+    返回包内的说明信息
+    """
+    privkeys = load_private_keys(private_keys)
+    staging_dir = tempfile.mkdtemp(prefix=".epkg-staging-", dir=dest_dir)
+    try:
+        _decrypt_package_to(epkg_path, privkeys, staging_dir, workers, progress)
+        info = _read_delta_info(os.path.join(staging_dir, DELTA_INFO_NAME))
+        if info is None:
+            raise EpkgFormatError("这不是增量包")
+        current = _read_delta_info(os.path.join(dest_dir, DELTA_INFO_NAME))
+        if info['base_generation'] is not None:
+            if current is None or current['manifest_id'] != info['manifest_id']:
+                raise EpkgFormatError("目标目录不是该增量包对应的解压目录，请先应用完整包")
+            if current['generation'] != info['base_generation']:
+                raise EpkgFormatError(f"该增量包需要叠加在第 {info['base_generation']} 次同步上，"
+                                      f"目标目录当前为第 {current['generation']} 次")
+        commit_staging_dir(staging_dir, dest_dir)
+        for relpath in info['deleted']:
+            target = _safe_member_path(dest_dir, relpath)
+            if target and os.path.isfile(target):
+                os.unlink(target)
+        return info
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
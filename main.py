@@ -1,25 +1,82 @@
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox, filedialog
-from Crypto.PublicKey import RSA
-from Crypto.Cipher import PKCS1_OAEP, AES
-from Crypto.Random import get_random_bytes
-import base64
+from tkinter import ttk, scrolledtext, messagebox, filedialog, simpledialog
 import pyperclip
 import ctypes
-import zipfile
 import os
-import tempfile
-import secrets
+import collections
+import json
+import multiprocessing
+import queue
+import threading
+import time
+
+from crypto_engine import (
+    OperationCancelled, CRYPTO_WORKERS, COMPRESS_WORKERS, COMPRESS_MEMORY_BUDGET, DEFAULT_COMPRESSION_LEVEL,
+    RSA_KEY_BITS, KEY_POOL_SIZE, KeyPairPool, key_cache, import_key, public_key_from_private,
+    encrypt_message, decrypt_message, decrypt_messages,
+    encrypt_package, decrypt_package, open_package_index, extract_package_members,
+    Keyring, split_pem_blocks, load_private_keys, PACKAGE_JOBS, list_epkg_files, decrypt_packages,
+    encrypt_file, decrypt_file, encrypt_delta_package, apply_delta_package,
+)
+
+
+class TransferMeter:
+    """根据(时间, 已处理字节)采样计算近几秒的吞吐量和剩余时间"""
+    WINDOW = 3.0  # 秒
+
+    def __init__(self):
+        self._samples = collections.deque()
+
+    def add(self, done, now=None):
+        now = time.monotonic() if now is None else now
+        self._samples.append((now, done))
+        # 保留窗口外最近的一个采样作为起点
+        while len(self._samples) > 2 and now - self._samples[1][0] >= self.WINDOW:
+            self._samples.popleft()
+
+    def rate(self):
+        """字节/秒，采样不足时返回None"""
+        if len(self._samples) < 2:
+            return None
+        (t0, d0), (t1, d1) = self._samples[0], self._samples[-1]
+        if t1 - t0 < 0.5:
+            return None
+        return (d1 - d0) / (t1 - t0)
+
+    def eta(self, done, total):
+        """剩余秒数，无法估计时返回None"""
+        rate = self.rate()
+        if not rate:
+            return None
+        return max(total - done, 0) / rate
+
+
+def format_size(size):
+    """格式化字节数"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_duration(seconds):
+    """格式化剩余时间为 mm:ss 或 h:mm:ss"""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    if hours:
+        return f"{hours}:{rest // 60:02d}:{rest % 60:02d}"
+    return f"{rest // 60:02d}:{rest % 60:02d}"
 
 
 class ProgressWindow:
     """进度条窗口"""
-    def __init__(self, parent, title="处理中..."):
+    def __init__(self, parent, title="处理中...", on_cancel=None):
         self.cancelled = False
+        self.on_cancel = on_cancel
         
         self.window = tk.Toplevel(parent.root)
         self.window.title(title)
-        self.window.geometry("400x150")
+        self.window.geometry("400x175")
         self.window.configure(bg=parent.colors['bg_main'])
         self.window.transient(parent.root)
         self.window.grab_set()
@@ -32,7 +89,7 @@ class ProgressWindow:
         
         # 居中显示
         win_x = parent.root.winfo_x() + (parent.root.winfo_width() // 2) - 200
-        win_y = parent.root.winfo_y() + (parent.root.winfo_height() // 2) - 75
+        win_y = parent.root.winfo_y() + (parent.root.winfo_height() // 2) - 88
         self.window.geometry(f"+{win_x}+{win_y}")
         
         # 主框架
@@ -48,7 +105,15 @@ class ProgressWindow:
         
         # 进度条
         self.progress = ttk.Progressbar(main_frame, length=300, mode='determinate')
-        self.progress.pack(pady=(0, 15))
+        self.progress.pack(pady=(0, 5))
+
+        # 吞吐量和剩余时间
+        self.meter = TransferMeter()
+        self.rate_label = tk.Label(main_frame, text="",
+                                   font=("Consolas", 9),
+                                   fg=parent.colors['text_light'],
+                                   bg=parent.colors['bg_light'])
+        self.rate_label.pack(pady=(0, 10))
         
         # 取消按钮
         self.cancel_btn = RoundedButton(main_frame, text="取消", 
@@ -60,15 +125,36 @@ class ProgressWindow:
         self.window.protocol("WM_DELETE_WINDOW", self.cancel)
         
     def update_progress(self, value, status="处理中..."):
-        """更新进度"""
+        """更新进度（只能在Tk主线程调用）"""
         if not self.cancelled:
             self.progress['value'] = value
             self.status_label.config(text=status)
-            self.window.update()
+
+    def update_bytes(self, done, total, status="处理中..."):
+        """按已处理字节数更新进度、速度和剩余时间（只能在Tk主线程调用）"""
+        if self.cancelled:
+            return
+        self.meter.add(done)
+        self.update_progress(done * 100 / total if total else 0, status)
+        text = f"{format_size(done)} / {format_size(total)}"
+        rate = self.meter.rate()
+        if rate is not None:
+            text += f"  ·  {rate / (1024 * 1024):.1f} MB/s"
+            eta = self.meter.eta(done, total)
+            if eta is not None:
+                text += f"  ·  剩余 {format_duration(eta)}"
+        self.rate_label.config(text=text)
+
+    def update_status(self, status):
+        """只更新状态文字，进度条保持不变"""
+        if not self.cancelled:
+            self.status_label.config(text=status)
     
     def cancel(self):
         """取消操作"""
         self.cancelled = True
+        if self.on_cancel:
+            self.on_cancel()
         self.window.destroy()
     
     def close(self):
@@ -77,6 +163,94 @@ class ProgressWindow:
             self.window.destroy()
 
 
+class BackgroundTask:
+    """在工作线程中执行耗时操作，进度和结果经队列交回Tk主线程
+
+    work(task)在工作线程运行，不能访问任何Tk控件；它通过task.update_progress/update_bytes/
+    update_status报告进度，这些调用同时是取消检查点。进度只保存最新一份快照，主线程按固定
+    频率用after()取走并刷新界面，热循环里报告进度只是一次赋值；结束消息经队列传递，
+    完成后调用on_done(结果)或on_error(异常)，取消后调用on_cancel()
+    """
+    POLL_INTERVAL = 100  # 毫秒，界面刷新频率
+
+    def __init__(self, app, title, work, on_done=None, on_error=None, on_cancel=None):
+        self.app = app
+        self.work = work
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self._queue = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._latest = None  # 最新进度快照，由工作线程整体替换
+        self.progress_win = ProgressWindow(app, title, on_cancel=self._cancel_event.set)
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        self.app.root.after(self.POLL_INTERVAL, self._poll)
+        return self
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        """工作线程调用：已取消时抛出OperationCancelled"""
+        if self._cancel_event.is_set():
+            raise OperationCancelled()
+
+    def update_progress(self, value, status="处理中..."):
+        """工作线程调用：按百分比报告进度并检查是否已取消"""
+        self.check_cancelled()
+        self._latest = ('progress', value, status)
+
+    def update_bytes(self, done, total, status="处理中..."):
+        """工作线程调用：按已处理字节数报告进度并检查是否已取消"""
+        self.check_cancelled()
+        self._latest = ('bytes', done, total, status)
+
+    def update_status(self, status):
+        """工作线程调用：只更新状态文字并检查是否已取消"""
+        self.check_cancelled()
+        self._latest = ('status', status)
+
+    def _run(self):
+        try:
+            result = self.work(self)
+        except OperationCancelled:
+            self._queue.put(('cancelled', None))
+        except Exception as e:
+            self._queue.put(('error', e))
+        else:
+            self._queue.put(('done', result))
+
+    def _poll(self):
+        """主线程：按最新快照刷新进度，取出结束消息"""
+        latest, self._latest = self._latest, None
+        if latest is not None:
+            kind, *args = latest
+            if kind == 'progress':
+                self.progress_win.update_progress(*args)
+            elif kind == 'bytes':
+                self.progress_win.update_bytes(*args)
+            else:
+                self.progress_win.update_status(*args)
+        try:
+            message = self._queue.get_nowait()
+        except queue.Empty:
+            self.app.root.after(self.POLL_INTERVAL, self._poll)
+            return
+        self.progress_win.close()
+        if message[0] == 'done' and self.on_done:
+            self.on_done(message[1])
+        elif message[0] == 'cancelled' and self.on_cancel:
+            self.on_cancel()
+        elif message[0] == 'error':
+            if self.on_error:
+                self.on_error(message[1])
+            else:
+                self.app._show_error_message("错误", f"❌ 操作失败: {str(message[1])}")
+
+
 class RoundedButton(tk.Canvas):
     """自定义圆角按钮"""
     def __init__(self, parent, text="", command=None, bg_color="#25ADF3", 
@@ -183,6 +357,23 @@ class RoundedButton(tk.Canvas):
 
 
 class AsymmetricChatApp:
+    # 界面显示名称 -> 压缩方式
+    COMPRESSION_CHOICES = {
+        "自动（跳过不可压缩文件）": 'auto',
+        "不压缩": 'stored',
+        "Deflate": 'deflate',
+        "BZip2": 'bz2',
+        "LZMA": 'lzma',
+    }
+    # 界面显示名称 -> (RSA位数, ECC曲线)
+    KEY_TYPE_CHOICES = {
+        "RSA 2048": (2048, None),
+        "RSA 3072": (3072, None),
+        "RSA 4096": (4096, None),
+        "ECC P-256": (RSA_KEY_BITS, 'P-256'),
+        "ECC P-384": (RSA_KEY_BITS, 'P-384'),
+    }
+
     def __init__(self, root):
         self.root = root
         self.root.title("非对称加/解密器")
@@ -202,6 +393,21 @@ class AsymmetricChatApp:
         # 公钥输入框列表
         self.pubkey_entries = []
         self.encrypted_result_boxes = []
+        # 各密钥文本框上次提供的密钥指纹，内容变化时据此清除密钥缓存
+        self._key_fingerprints = {}
+
+        # 分段加解密使用的线程数
+        self.crypto_workers = CRYPTO_WORKERS
+        # 成员并行压缩的进程数和单进程内存上限
+        self.compress_workers = COMPRESS_WORKERS
+        self.compress_memory_budget = COMPRESS_MEMORY_BUDGET
+        # 批量解密时同时处理的加密包数
+        self.package_jobs = PACKAGE_JOBS
+        # 后台预生成的密钥对，启动后在_build_keys_frame中按界面设置创建
+        self.keypair_pool = None
+        # 接收方密钥环，第一次打开时加载；从中选出的接收方以指纹保存
+        self.keyring = None
+        self.keyring_recipients = []
         
         self._setup_styles()
         self._create_layout()
@@ -429,6 +635,9 @@ class AsymmetricChatApp:
         # 更新公钥输入框架
         if hasattr(self, 'pubkey_entries_frame'):
             self.pubkey_entries_frame.configure(bg=self.colors['bg_light'])
+
+        if hasattr(self, 'keyring_recipients_label'):
+            self.keyring_recipients_label.configure(fg=self.colors['text_light'], bg=self.colors['bg_light'])
         
         # 更新加密结果框架
         if hasattr(self, 'encrypted_results_frame'):
@@ -586,6 +795,27 @@ class AsymmetricChatApp:
         )
         return textbox
 
+    def _watch_key_textbox(self, textbox):
+        """文本框内容被修改时，从密钥缓存中清除它上次提供的密钥"""
+        textbox.bind("<<Modified>>", lambda event: self._on_key_textbox_modified(textbox))
+
+    def _on_key_textbox_modified(self, textbox):
+        if textbox.edit_modified():
+            # 复位修改标志，下一次修改才会再次触发<<Modified>>
+            textbox.edit_modified(False)
+            self._forget_key_textbox(textbox)
+
+    def _forget_key_textbox(self, textbox):
+        for fingerprint in self._key_fingerprints.pop(str(textbox), ()):
+            key_cache.discard(fingerprint)
+
+    def _read_key_textbox(self, textbox):
+        """读取密钥文本框内容，并记下其中每个PEM块的指纹以便内容变化时使缓存失效"""
+        pem = textbox.get(1.0, tk.END).strip()
+        if pem:
+            self._key_fingerprints[str(textbox)] = [key_cache.fingerprint(block) for block in split_pem_blocks(pem)]
+        return pem
+
     def _copy_textbox_content(self, textbox, copy_btn, key_type=None):
         """复制文本框内容到剪贴板"""
         if key_type == 'privkey':
@@ -619,6 +849,7 @@ class AsymmetricChatApp:
         # 公钥文本框和复制按钮
         pubkey_container, self.pubkey_box = self._create_textbox_with_copy(self.frame_keys, height=6, key_type='pubkey')
         pubkey_container.pack(fill="x", pady=(0, 15))
+        self._watch_key_textbox(self.pubkey_box)
 
         # 私钥标签
         privkey_label = ttk.Label(self.frame_keys, text="🔒 私钥:", style="Subtitle.TLabel")
@@ -638,7 +869,34 @@ class AsymmetricChatApp:
         warning_label = ttk.Label(self.frame_keys, 
                                   text="注意：为防止剪贴板被恶意软件读取，强烈建议勾选此项。",
                                   style="Warning.TLabel")
-        warning_label.pack(anchor="w", pady=(0, 20))
+        warning_label.pack(anchor="w", pady=(0, 10))
+
+        # 密钥类型和后台预生成数量（0表示不预生成）
+        keygen_frame = tk.Frame(self.frame_keys, bg=self.colors['bg_light'])
+        keygen_frame.pack(fill="x", pady=(0, 15))
+
+        key_type_label = tk.Label(keygen_frame, text="密钥类型:",
+                                  font=("Microsoft YaHei UI", 9),
+                                  fg=self.colors['text_light'], bg=self.colors['bg_light'])
+        key_type_label.pack(side="left", padx=(0, 5))
+
+        self.key_type = tk.StringVar(value=list(self.KEY_TYPE_CHOICES)[0])
+        key_type_box = ttk.Combobox(keygen_frame, textvariable=self.key_type,
+                                    values=list(self.KEY_TYPE_CHOICES), state="readonly", width=10)
+        key_type_box.pack(side="left", padx=(0, 10))
+        key_type_box.bind("<<ComboboxSelected>>", lambda event: self._configure_keypair_pool())
+
+        pool_label = tk.Label(keygen_frame, text="后台预生成:",
+                              font=("Microsoft YaHei UI", 9),
+                              fg=self.colors['text_light'], bg=self.colors['bg_light'])
+        pool_label.pack(side="left", padx=(0, 5))
+
+        self.key_pool_size = tk.IntVar(value=KEY_POOL_SIZE)
+        pool_box = ttk.Spinbox(keygen_frame, from_=0, to=8, width=4,
+                               textvariable=self.key_pool_size, state="readonly",
+                               command=self._configure_keypair_pool)
+        pool_box.pack(side="left")
+        self._configure_keypair_pool()
 
         # 按钮容器
         self.keys_btn_frame = tk.Frame(self.frame_keys, bg=self.colors['bg_light'])
@@ -672,6 +930,13 @@ class AsymmetricChatApp:
                                        width=110, height=45)
         btn_clear_keys.pack(side="left", expand=True, padx=2)
 
+    def _configure_keypair_pool(self):
+        """按当前设置重建后台密钥池，旧池中的密钥一并丢弃"""
+        if self.keypair_pool is not None:
+            self.keypair_pool.stop()
+        bits, curve = self.KEY_TYPE_CHOICES[self.key_type.get()]
+        self.keypair_pool = KeyPairPool(self.key_pool_size.get(), bits, curve).start()
+
     def _build_encrypt_frame(self):
         # 输入消息标签
         msg_label = ttk.Label(self.frame_encrypt, text="💬 输入要发送的信息:", style="Subtitle.TLabel")
@@ -692,16 +957,30 @@ class AsymmetricChatApp:
         btn_add_pubkey = RoundedButton(self.pubkey_control_frame, text="➕ 添加接收方", 
                                       command=self.add_pubkey_entry,
                                       bg_color=self.colors['primary'],
-                                      width=200, height=45,
+                                      width=160, height=45,
                                       font=("Microsoft YaHei UI", 10, "bold"))
         btn_add_pubkey.pack(side="left", padx=(0, 5))
         
         btn_remove_pubkey = RoundedButton(self.pubkey_control_frame, text="➖ 删除接收方", 
                                          command=self.remove_pubkey_entry,
                                          bg_color=self.colors['primary'],
-                                         width=200, height=45,
+                                         width=160, height=45,
                                          font=("Microsoft YaHei UI", 10, "bold"))
-        btn_remove_pubkey.pack(side="left")
+        btn_remove_pubkey.pack(side="left", padx=(0, 5))
+
+        btn_keyring = RoundedButton(self.pubkey_control_frame, text="📒 密钥环",
+                                    command=self._show_keyring_window,
+                                    bg_color=self.colors['secondary'],
+                                    width=130, height=45,
+                                    font=("Microsoft YaHei UI", 10, "bold"))
+        btn_keyring.pack(side="left")
+
+        # 从密钥环选中的接收方
+        self.keyring_recipients_label = tk.Label(self.frame_encrypt, text="",
+                                                 font=("Microsoft YaHei UI", 9),
+                                                 fg=self.colors['text_light'], bg=self.colors['bg_light'],
+                                                 anchor="w", justify="left")
+        self.keyring_recipients_label.pack(fill="x")
         
         # 公钥输入框容器
         self.pubkey_entries_frame = tk.Frame(self.frame_encrypt, bg=self.colors['bg_light'])
@@ -774,6 +1053,7 @@ class AsymmetricChatApp:
         
         textbox = self._create_textbox(entry_frame, height=3)
         textbox.pack(fill="x", pady=(2, 0))
+        self._watch_key_textbox(textbox)
         
         entry_data = {
             'frame': entry_frame,
@@ -788,6 +1068,7 @@ class AsymmetricChatApp:
         """删除公钥输入框"""
         if len(self.pubkey_entries) > 1:  # 至少保留一个
             entry_data = self.pubkey_entries.pop()
+            self._forget_key_textbox(entry_data['textbox'])
             entry_data['frame'].destroy()
             self._update_pubkey_labels()
 
@@ -796,6 +1077,186 @@ class AsymmetricChatApp:
         for i, entry_data in enumerate(self.pubkey_entries):
             entry_data['label'].config(text=f"公钥 {i + 1}:")
 
+    def _get_keyring(self):
+        """加载密钥环，失败时提示并返回None"""
+        if self.keyring is None:
+            try:
+                self.keyring = Keyring()
+            except (OSError, ValueError, KeyError) as e:
+                self._show_error_message("错误", f"❌ 无法加载密钥环: {str(e)}")
+                return None
+        return self.keyring
+
+    def _collect_recipients(self):
+        """收集输入框中的公钥PEM和从密钥环选中的公钥指纹"""
+        pubkeys = []
+        for entry_data in self.pubkey_entries:
+            pubkey_text = self._read_key_textbox(entry_data['textbox'])
+            if pubkey_text:
+                pubkeys.append(pubkey_text)
+        return pubkeys + list(self.keyring_recipients)
+
+    def _resolve_recipient(self, recipient):
+        """工作线程中把密钥环指纹换成公钥对象，PEM原样返回"""
+        if self.keyring is not None and recipient in self.keyring_recipients:
+            return self.keyring.public_key(recipient)
+        return recipient
+
+    def _update_keyring_recipients_label(self):
+        if not self.keyring_recipients:
+            self.keyring_recipients_label.config(text="")
+            return
+        names = {entry['fingerprint']: entry['name'] for entry in self.keyring.entries()}
+        shown = [names.get(fingerprint, fingerprint[:12]) for fingerprint in self.keyring_recipients[:10]]
+        more = len(self.keyring_recipients) - len(shown)
+        text = "📒 密钥环接收方: " + "、".join(shown) + (f" 等 {len(self.keyring_recipients)} 个" if more else "")
+        self.keyring_recipients_label.config(text=text)
+
+    def _show_keyring_window(self):
+        """管理密钥环：导入/删除公钥、按选中的公钥建立分组、把公钥或分组设为接收方"""
+        keyring = self._get_keyring()
+        if keyring is None:
+            return
+
+        keyring_win = tk.Toplevel(self.root)
+        keyring_win.title("密钥环")
+        keyring_win.configure(bg=self.colors['bg_main'])
+        keyring_win.transient(self.root)
+        keyring_win.geometry("760x480")
+
+        try:
+            keyring_win.iconbitmap('asset/icon.ico')
+        except tk.TclError:
+            pass
+
+        keyring_frame = tk.Frame(keyring_win, bg=self.colors['bg_light'], padx=20, pady=20)
+        keyring_frame.pack(fill="both", expand=True, padx=20, pady=20)
+
+        lists_frame = tk.Frame(keyring_frame, bg=self.colors['bg_light'])
+        lists_frame.pack(fill="both", expand=True)
+
+        def make_listbox(title):
+            column = tk.Frame(lists_frame, bg=self.colors['bg_light'])
+            column.pack(side="left", fill="both", expand=True, padx=(0, 10))
+            ttk.Label(column, text=title, style="Subtitle.TLabel").pack(anchor="w", pady=(0, 5))
+            listbox = tk.Listbox(column, selectmode=tk.EXTENDED, exportselection=False,
+                                 font=("Consolas", 10),
+                                 bg=self.colors['bg_main'],
+                                 fg=self.colors['text_light'],
+                                 selectbackground=self.colors['primary'],
+                                 relief="solid", borderwidth=1, highlightthickness=0)
+            listbox.pack(fill="both", expand=True)
+            return listbox
+
+        keys_listbox = make_listbox("🔑 公钥（可按住Ctrl/Shift多选）")
+        groups_listbox = make_listbox("👥 分组")
+        shown = {'entries': [], 'groups': []}
+
+        def refresh():
+            shown['entries'] = keyring.entries()
+            shown['groups'] = sorted(keyring.groups().items())
+            keys_listbox.delete(0, tk.END)
+            for entry in shown['entries']:
+                keys_listbox.insert(tk.END, f"{entry['name']}  [{entry['type'].upper()}] {entry['fingerprint'][:16]}")
+            groups_listbox.delete(0, tk.END)
+            for name, members in shown['groups']:
+                groups_listbox.insert(tk.END, f"{name}  ({len(members)} 个公钥)")
+
+        def save():
+            try:
+                keyring.save()
+            except OSError as e:
+                self._show_error_message("错误", f"❌ 保存密钥环失败: {str(e)}")
+
+        def add_keys():
+            paths = filedialog.askopenfilenames(
+                parent=keyring_win, title="选择要导入的公钥",
+                filetypes=[("PEM文件", "*.pem"), ("所有文件", "*.*")])
+            failed = []
+            for path in paths:
+                default_name = os.path.splitext(os.path.basename(path))[0]
+                name = default_name if len(paths) > 1 else simpledialog.askstring(
+                    "公钥名称", "请输入该公钥的名称:", initialvalue=default_name, parent=keyring_win)
+                if not name:
+                    continue
+                try:
+                    with open(path, 'r') as f:
+                        keyring.add(name, f.read())
+                except (OSError, ValueError, TypeError, IndexError) as e:
+                    failed.append(f"{os.path.basename(path)}: {str(e)}")
+            if paths:
+                save()
+                refresh()
+            if failed:
+                self._show_error_message("错误", "❌ 以下公钥导入失败:\n" + "\n".join(failed))
+
+        def remove_keys():
+            selected = [shown['entries'][i] for i in keys_listbox.curselection()]
+            if not selected:
+                self._show_warning_message("警告", "⚠️ 请先选择要删除的公钥")
+                return
+            if not messagebox.askyesno("确认", f"确定从密钥环删除 {len(selected)} 个公钥吗？", parent=keyring_win):
+                return
+            for entry in selected:
+                keyring.remove(entry['fingerprint'])
+                if entry['fingerprint'] in self.keyring_recipients:
+                    self.keyring_recipients.remove(entry['fingerprint'])
+            save()
+            refresh()
+            self._update_keyring_recipients_label()
+
+        def create_group():
+            selected = [shown['entries'][i]['fingerprint'] for i in keys_listbox.curselection()]
+            if not selected:
+                self._show_warning_message("警告", "⚠️ 请先选择分组中的公钥")
+                return
+            name = simpledialog.askstring("新建分组", f"请输入分组名称（{len(selected)} 个公钥）:", parent=keyring_win)
+            if not name:
+                return
+            keyring.set_group(name, selected)
+            save()
+            refresh()
+
+        def remove_groups():
+            selected = [shown['groups'][i][0] for i in groups_listbox.curselection()]
+            if not selected:
+                self._show_warning_message("警告", "⚠️ 请先选择要删除的分组")
+                return
+            for name in selected:
+                keyring.remove_group(name)
+            save()
+            refresh()
+
+        def use_selected():
+            recipients = [shown['entries'][i]['fingerprint'] for i in keys_listbox.curselection()]
+            for i in groups_listbox.curselection():
+                recipients.extend(shown['groups'][i][1])
+            if not recipients:
+                self._show_warning_message("警告", "⚠️ 请先选择公钥或分组")
+                return
+            # 去重并保持顺序
+            self.keyring_recipients = list(dict.fromkeys(recipients))
+            self._update_keyring_recipients_label()
+            keyring_win.destroy()
+
+        def clear_recipients():
+            self.keyring_recipients = []
+            self._update_keyring_recipients_label()
+
+        btn_frame = tk.Frame(keyring_frame, bg=self.colors['bg_light'])
+        btn_frame.pack(pady=(15, 0))
+        for text, command, color, width in (
+                ("➕ 导入公钥", add_keys, self.colors['primary'], 120),
+                ("➖ 删除公钥", remove_keys, self.colors['primary'], 120),
+                ("👥 新建分组", create_group, self.colors['primary'], 120),
+                ("删除分组", remove_groups, self.colors['primary'], 100),
+                ("✅ 设为接收方", use_selected, self.colors['accent'], 130),
+                ("清除接收方", clear_recipients, self.colors['secondary'], 110)):
+            RoundedButton(btn_frame, text=text, command=command, bg_color=color,
+                          width=width, height=35).pack(side="left", padx=(0, 8))
+
+        refresh()
+
     def _build_decrypt_frame(self):
         # 加密消息标签
         encrypted_msg_label = ttk.Label(self.frame_decrypt, text="📨 输入加密的消息:", style="Subtitle.TLabel")
@@ -805,11 +1266,13 @@ class AsymmetricChatApp:
         self.msg_to_decrypt.pack(fill="x", pady=(0, 15))
 
         # 私钥输入标签
-        privkey_input_label = ttk.Label(self.frame_decrypt, text="🔐 输入私钥:", style="Subtitle.TLabel")
+        privkey_input_label = ttk.Label(self.frame_decrypt, text="🔐 输入私钥（可粘贴多把，按密文中的密钥ID自动选用）:",
+                                        style="Subtitle.TLabel")
         privkey_input_label.pack(anchor="w", pady=(0, 5))
         
         self.privkey_input = self._create_textbox(self.frame_decrypt, height=5)
         self.privkey_input.pack(fill="x", pady=(0, 20))
+        self._watch_key_textbox(self.privkey_input)
 
         # 按钮容器
         self.decrypt_btn_frame = tk.Frame(self.frame_decrypt, bg=self.colors['bg_light'])
@@ -819,9 +1282,23 @@ class AsymmetricChatApp:
         btn_decrypt = RoundedButton(self.decrypt_btn_frame, text="🔓 解密！", 
                                    command=self.decrypt_message,
                                    bg_color=self.colors['secondary'],
-                                   width=220, height=45)
+                                   width=150, height=45)
         btn_decrypt.pack(side="left", padx=(0, 10))
 
+        # 批量解密按钮：输入框中每行一条消息，输入框为空时从文件载入
+        btn_decrypt_batch = RoundedButton(self.decrypt_btn_frame, text="📚 批量解密",
+                                          command=self.decrypt_messages_batch,
+                                          bg_color=self.colors['secondary'],
+                                          width=130, height=45)
+        btn_decrypt_batch.pack(side="left", padx=(0, 10))
+
+        # 从文件追加私钥，多把私钥可同时使用
+        btn_add_privkey = RoundedButton(self.decrypt_btn_frame, text="📂 追加私钥",
+                                        command=self._append_private_keys,
+                                        bg_color=self.colors['secondary'],
+                                        width=130, height=45)
+        btn_add_privkey.pack(side="left", padx=(0, 10))
+
         # 清空解密栏按钮
         btn_clear_decrypt = RoundedButton(self.decrypt_btn_frame, text="清空",
                                           command=self._clear_decrypt_frame_content,
@@ -861,6 +1338,34 @@ class AsymmetricChatApp:
                                          width=160, height=45)
         btn_encrypt_files.pack(side="left", padx=(0, 10))
 
+        # 单文件加密：每个文件单独生成.enc，不打包不压缩，适合大文件
+        btn_encrypt_single = RoundedButton(encrypt_file_btn_frame, text="⚡ 单文件加密(.enc)",
+                                           command=self._encrypt_file,
+                                           bg_color=self.colors['accent'],
+                                           width=190, height=45)
+        btn_encrypt_single.pack(side="left", padx=(0, 10))
+
+        # 压缩方式选择
+        codec_label = tk.Label(encrypt_file_btn_frame, text="压缩方式:",
+                               font=("Microsoft YaHei UI", 9),
+                               fg=self.colors['text_light'], bg=self.colors['bg_light'])
+        codec_label.pack(side="left", padx=(10, 5))
+
+        self.compression_codec = tk.StringVar(value=list(self.COMPRESSION_CHOICES)[0])
+        codec_box = ttk.Combobox(encrypt_file_btn_frame, textvariable=self.compression_codec,
+                                 values=list(self.COMPRESSION_CHOICES), state="readonly", width=22)
+        codec_box.pack(side="left", padx=(0, 10))
+
+        level_label = tk.Label(encrypt_file_btn_frame, text="压缩级别:",
+                               font=("Microsoft YaHei UI", 9),
+                               fg=self.colors['text_light'], bg=self.colors['bg_light'])
+        level_label.pack(side="left", padx=(0, 5))
+
+        self.compression_level = tk.IntVar(value=DEFAULT_COMPRESSION_LEVEL)
+        level_box = ttk.Spinbox(encrypt_file_btn_frame, from_=1, to=9, width=4,
+                                textvariable=self.compression_level, state="readonly")
+        level_box.pack(side="left")
+
         self.selected_files_label = ttk.Label(file_frame, text="未选择文件", 
                                              style="Subtitle.TLabel")
         self.selected_files_label.pack(anchor="w", pady=(0, 15))
@@ -876,7 +1381,52 @@ class AsymmetricChatApp:
                                         command=self._decrypt_epkg_file,
                                         bg_color=self.colors['secondary'],
                                         width=250, height=45)
-        btn_decrypt_file.pack(side="left")
+        btn_decrypt_file.pack(side="left", padx=(0, 10))
+
+        btn_browse_file = RoundedButton(decrypt_file_btn_frame, text="📋 查看/提取部分文件", 
+                                        command=self._browse_epkg_file,
+                                        bg_color=self.colors['primary'],
+                                        width=250, height=45)
+        btn_browse_file.pack(side="left", padx=(0, 10))
+
+        btn_decrypt_single = RoundedButton(decrypt_file_btn_frame, text="⚡ 解密 .enc 文件",
+                                           command=self._decrypt_file,
+                                           bg_color=self.colors['secondary'],
+                                           width=200, height=45)
+        btn_decrypt_single.pack(side="left", padx=(0, 10))
+
+        # 解密目录中的所有加密包，每个包解压到单独的子目录
+        btn_decrypt_dir = RoundedButton(decrypt_file_btn_frame, text="📦 批量解密目录",
+                                        command=self._decrypt_epkg_directory,
+                                        bg_color=self.colors['secondary'],
+                                        width=200, height=45)
+        btn_decrypt_dir.pack(side="left")
+
+        # 断点续传默认关闭：开启后加密包的检查点日志（含包密钥）保存在用户目录下的私有目录中
+        self.resume_jobs = tk.BooleanVar(value=False)
+        chk_resume = ttk.Checkbutton(file_frame, text="断点续传：取消或中断后，以同样的文件/位置重新加密或解密 .epkg 时从检查点继续",
+                                     variable=self.resume_jobs,
+                                     style="Custom.TCheckbutton")
+        chk_resume.pack(anchor="w", pady=(0, 10))
+
+        # 增量同步：发送方只打包变化的文件，接收方叠加到上一次的解压目录
+        delta_label = ttk.Label(file_frame, text="🔁 增量同步:", style="Subtitle.TLabel")
+        delta_label.pack(anchor="w", pady=(0, 5))
+
+        delta_btn_frame = tk.Frame(file_frame, bg=self.colors['bg_light'])
+        delta_btn_frame.pack(fill="x", pady=(0, 10))
+
+        btn_delta_encrypt = RoundedButton(delta_btn_frame, text="🔁 增量打包目录",
+                                          command=self._encrypt_delta_directory,
+                                          bg_color=self.colors['accent'],
+                                          width=200, height=45)
+        btn_delta_encrypt.pack(side="left", padx=(0, 10))
+
+        btn_delta_apply = RoundedButton(delta_btn_frame, text="📥 应用增量包",
+                                        command=self._apply_delta_packages,
+                                        bg_color=self.colors['secondary'],
+                                        width=200, height=45)
+        btn_delta_apply.pack(side="left")
 
         self.file_frame = file_frame
         self.selected_files = []
@@ -904,124 +1454,51 @@ class AsymmetricChatApp:
             self._show_warning_message("警告", "⚠️ 请先选择要加密的文件")
             return
 
-        # 获取接收方公钥
-        pubkeys = []
-        for entry_data in self.pubkey_entries:
-            pubkey_text = entry_data['textbox'].get(1.0, tk.END).strip()
-            if pubkey_text:
-                pubkeys.append(pubkey_text)
-
+        # 获取接收方公钥（含密钥环中选中的接收方）
+        pubkeys = self._collect_recipients()
         if not pubkeys:
             self._show_warning_message("警告", "⚠️ 请在加密栏中输入至少一个接收方公钥")
             return
 
-        # 创建进度条窗口
-        progress_win = ProgressWindow(self, "文件加密中...")
-        
-        try:
-            # 步骤1: 生成AES密钥
-            progress_win.update_progress(10, "生成加密密钥...")
-            if progress_win.cancelled:
-                return
-            aes_key = secrets.token_bytes(32)
-            
-            # 步骤2: 创建ZIP文件
-            progress_win.update_progress(20, "压缩文件...")
-            if progress_win.cancelled:
-                return
-                 
-            # 创建临时ZIP文件
-            temp_zip_fd, temp_zip_path = tempfile.mkstemp(suffix='.zip')
-            try:
-                # 关闭文件描述符，只保留路径
-                os.close(temp_zip_fd)
-                 
-                # 创建ZIP文件
-                with zipfile.ZipFile(temp_zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-                    for i, file_path in enumerate(self.selected_files):
-                        if progress_win.cancelled:
-                            return
-                        progress = 20 + (i + 1) * 20 // len(self.selected_files)
-                        progress_win.update_progress(progress, f"压缩文件 {i+1}/{len(self.selected_files)}...")
-                        arcname = os.path.basename(file_path)
-                        zf.write(file_path, arcname)
-                 
-                 # 读取ZIP文件内容
-                progress_win.update_progress(45, "读取压缩文件...")
-                if progress_win.cancelled:
-                    return
-                with open(temp_zip_path, 'rb') as f:
-                    zip_data = f.read()
-                 
-            finally:
-                # 确保删除临时文件
-                try:
-                    os.unlink(temp_zip_path)
-                except OSError:
-                    pass  # 文件可能已经被删除
+        # 所有接收方共用一个加密包，先选择保存位置
+        save_path = filedialog.asksaveasfilename(
+            title=f"保存加密文件 ({len(pubkeys)} 个接收方)",
+            defaultextension=".epkg",
+            filetypes=[("加密包文件", "*.epkg"), ("所有文件", "*.*")]
+        )
+        if not save_path:
+            return
 
-            # 步骤3: AES加密
-            progress_win.update_progress(60, "AES加密中...")
-            if progress_win.cancelled:
-                return
-            cipher_aes = AES.new(aes_key, AES.MODE_GCM)
-            ciphertext, tag = cipher_aes.encrypt_and_digest(zip_data)
-             
-            # 准备AES加密信息
-            aes_info = aes_key + cipher_aes.nonce + tag
-             
-            # 步骤4: 为每个公钥加密
-            for i, pubkey_str in enumerate(pubkeys):
-                if progress_win.cancelled:
-                    return
-                     
-                progress = 70 + (i + 1) * 20 // len(pubkeys)
-                progress_win.update_progress(progress, f"为接收方 {i+1} 加密...")
-                 
-                try:
-                    pubkey = RSA.import_key(pubkey_str)
-                    cipher_rsa = PKCS1_OAEP.new(pubkey)
-                     
-                    # RSA加密AES信息
-                    encrypted_aes_info = cipher_rsa.encrypt(aes_info)
-                     
-                    # 保存.epkg文件
-                    save_path = filedialog.asksaveasfilename(
-                        title=f"保存加密文件 (接收方 {i+1})",
-                        defaultextension=".epkg",
-                        filetypes=[("加密包文件", "*.epkg"), ("所有文件", "*.*")]
-                    )
-                     
-                    if save_path:
-                        progress_win.update_progress(90 + i * 5, f"保存文件 {i+1}...")
-                        if progress_win.cancelled:
-                            return
-                             
-                        with open(save_path, 'wb') as f:
-                            # 写入加密的AES信息长度（4字节）
-                            f.write(len(encrypted_aes_info).to_bytes(4, 'big'))
-                            # 写入加密的AES信息
-                            f.write(encrypted_aes_info)
-                            # 写入加密的文件数据
-                            f.write(ciphertext)
-                         
-                        progress_win.update_progress(100, "加密完成！")
-                        self._show_success_message("成功", f"✅ 文件已加密并保存到: {save_path}")
-                     
-                except Exception as e:
-                    progress_win.close()
-                    self._show_error_message("错误", f"❌ 为接收方 {i+1} 加密失败: {str(e)}")
-                    return
-             
-            progress_win.close()
-                     
-        except Exception as e:
-            progress_win.close()
-            self._show_error_message("错误", f"❌ 文件加密失败: {str(e)}")
+        # 控件状态在主线程读取，工作线程只接触普通数据
+        files = list(self.selected_files)
+        codec = self.COMPRESSION_CHOICES[self.compression_codec.get()]
+        level = self.compression_level.get()
+        resume = self.resume_jobs.get()
+
+        def work(task):
+            # 为每个接收方封装同一个AES密钥，压缩数据直接流入分段加密器
+            task.update_status("封装密钥...")
+            public_keys = [self._resolve_recipient(pubkey) for pubkey in pubkeys]
+            # 开启断点续传时定期写出检查点，再次加密同样的文件到同一位置时从检查点继续
+            encrypt_package(files, public_keys, save_path, codec, level,
+                            crypto_workers=self.crypto_workers,
+                            compress_workers=self.compress_workers,
+                            memory_budget=self.compress_memory_budget,
+                            progress=self._make_progress_callback(task, "压缩并加密文件..."),
+                            resume=resume)
+
+        BackgroundTask(
+            self, "文件加密中...", work,
+            on_done=lambda _: self._show_success_message(
+                "成功", f"✅ 文件已为 {len(pubkeys)} 个接收方加密并保存到: {save_path}"),
+            on_error=lambda e: self._show_error_message("错误", f"❌ 文件加密失败: {str(e)}"),
+            on_cancel=(lambda: self._show_warning_message(
+                "已取消", "⚠️ 已完成的部分已保存，再次加密同样的文件到同一位置即可继续")) if resume else None,
+        ).start()
 
     def _decrypt_epkg_file(self):
         """解密.epkg文件"""
-        privkey_str = self.privkey_input.get(1.0, tk.END).strip()
+        privkey_str = self._read_key_textbox(self.privkey_input)
         if not privkey_str:
             self._show_warning_message("警告", "⚠️ 请在解密栏中输入私钥")
             return
@@ -1035,160 +1512,364 @@ class AsymmetricChatApp:
         if not epkg_path:
             return
 
-        # 创建进度条窗口
-        progress_win = ProgressWindow(self, "文件解密中...")
-        
+        # 边解密边解压，需要先选择解压目录
+        extract_dir = filedialog.askdirectory(title="选择解压目录")
+        if not extract_dir:
+            return
+        resume = self.resume_jobs.get()
+
+        def work(task):
+            # 引擎先解压到暂存目录，全部认证通过后才移入解压目录
+            task.update_status("解密密钥信息...")
+            decrypt_package(epkg_path, privkey_str, extract_dir, workers=self.crypto_workers,
+                            progress=self._make_progress_callback(task, "解密并解压文件..."),
+                            resume=resume)
+
+        BackgroundTask(
+            self, "文件解密中...", work,
+            on_done=lambda _: self._show_success_message("成功", f"✅ 文件已解密并解压到: {extract_dir}"),
+            on_error=lambda e: self._show_error_message("错误", f"❌ 文件解密失败: {str(e)}"),
+            on_cancel=(lambda: self._show_warning_message(
+                "已取消", "⚠️ 已解压的部分已保存，再次解密该文件到同一目录即可继续")) if resume else None,
+        ).start()
+
+    def _decrypt_epkg_directory(self):
+        """批量解密目录中的所有.epkg文件，私钥只导入一次，多个包并行"""
+        privkey_str = self._read_key_textbox(self.privkey_input)
+        if not privkey_str:
+            self._show_warning_message("警告", "⚠️ 请在解密栏中输入私钥")
+            return
+
+        source_dir = filedialog.askdirectory(title="选择包含.epkg文件的目录")
+        if not source_dir:
+            return
+        epkg_paths = list_epkg_files([source_dir])
+        if not epkg_paths:
+            self._show_warning_message("警告", "⚠️ 该目录中没有.epkg文件")
+            return
+
+        extract_dir = filedialog.askdirectory(title=f"选择解压目录（{len(epkg_paths)} 个加密包，各自解压到子目录）")
+        if not extract_dir:
+            return
+
+        def work(task):
+            task.update_status("导入私钥...")
+            privkeys = load_private_keys(privkey_str)
+            return decrypt_packages(epkg_paths, privkeys, extract_dir, jobs=self.package_jobs,
+                                    progress=self._make_progress_callback(
+                                        task, f"批量解密 {len(epkg_paths)} 个加密包..."))
+
+        BackgroundTask(
+            self, "批量解密中...", work,
+            on_done=lambda records: self._show_batch_report_window(extract_dir, records),
+            on_error=lambda e: self._show_error_message("错误", f"❌ 批量解密失败: {str(e)}"),
+        ).start()
+
+    def _show_batch_report_window(self, extract_dir, records):
+        """显示批量解密的逐个结果，可保存为JSON报告"""
+        failed = [record for record in records if record['status'] != 'ok']
+        report_win = tk.Toplevel(self.root)
+        report_win.title("批量解密结果")
+        report_win.configure(bg=self.colors['bg_main'])
+        report_win.transient(self.root)
+        report_win.geometry("700x420")
+
         try:
-            # 步骤1: 导入私钥
-            progress_win.update_progress(10, "验证私钥...")
-            if progress_win.cancelled:
-                return
-            privkey = RSA.import_key(privkey_str)
-            cipher_rsa = PKCS1_OAEP.new(privkey)
-             
-            # 步骤2: 读取加密文件
-            progress_win.update_progress(20, "读取加密文件...")
-            if progress_win.cancelled:
-                return
-                 
-            with open(epkg_path, 'rb') as f:
-                # 读取加密的AES信息长度
-                aes_info_len = int.from_bytes(f.read(4), 'big')
-                # 读取加密的AES信息
-                encrypted_aes_info = f.read(aes_info_len)
-                # 读取加密的文件数据
-                encrypted_data = f.read()
-             
-            # 步骤3: 解密AES信息
-            progress_win.update_progress(40, "解密密钥信息...")
-            if progress_win.cancelled:
-                return
-            aes_info = cipher_rsa.decrypt(encrypted_aes_info)
-            aes_key = aes_info[:32]
-            nonce = aes_info[32:48]
-            tag = aes_info[48:64]
-             
-            # 步骤4: 解密文件数据
-            progress_win.update_progress(60, "解密文件数据...")
-            if progress_win.cancelled:
-                return
-            cipher_aes = AES.new(aes_key, AES.MODE_GCM, nonce=nonce)
-            decrypted_data = cipher_aes.decrypt_and_verify(encrypted_data, tag)
-             
-            # 步骤5: 选择解压目录
-            progress_win.update_progress(80, "准备解压...")
-            extract_dir = filedialog.askdirectory(title="选择解压目录")
-            if not extract_dir:
-                progress_win.close()
-                return
-             
-            if progress_win.cancelled:
+            report_win.iconbitmap('asset/icon.ico')
+        except tk.TclError:
+            pass
+
+        report_frame = tk.Frame(report_win, bg=self.colors['bg_light'], padx=20, pady=20)
+        report_frame.pack(fill="both", expand=True, padx=20, pady=20)
+
+        summary = f"✅ 成功 {len(records) - len(failed)} 个"
+        if failed:
+            summary += f"，❌ 失败 {len(failed)} 个"
+        summary_label = ttk.Label(report_frame, text=f"{summary}，解压到: {extract_dir}", style="Subtitle.TLabel")
+        summary_label.pack(anchor="w", pady=(0, 5))
+
+        listbox = tk.Listbox(report_frame, font=("Consolas", 10),
+                             bg=self.colors['bg_main'],
+                             fg=self.colors['text_light'],
+                             selectbackground=self.colors['primary'],
+                             relief="solid", borderwidth=1, highlightthickness=0)
+        listbox.pack(fill="both", expand=True)
+        # 失败的排在前面
+        for record in failed + [record for record in records if record['status'] == 'ok']:
+            name = os.path.basename(record['input'])
+            if record['status'] == 'ok':
+                listbox.insert(tk.END, f"✅ {name}  ({format_size(record['bytes'])}, {record['seconds']:.1f}s)")
+            else:
+                listbox.insert(tk.END, f"❌ {name}: {record['error']}")
+
+        def save_report():
+            report_path = filedialog.asksaveasfilename(
+                parent=report_win, title="保存报告", defaultextension=".json",
+                filetypes=[("JSON文件", "*.json"), ("所有文件", "*.*")])
+            if not report_path:
                 return
-                 
-            # 步骤6: 解压文件
-            progress_win.update_progress(90, "解压文件...")
-             
-            # 创建临时ZIP文件并解压
-            temp_zip_fd, temp_zip_path = tempfile.mkstemp(suffix='.zip')
             try:
-                # 关闭文件描述符，只保留路径
-                os.close(temp_zip_fd)
-                 
-                # 写入解密的数据到临时文件
-                with open(temp_zip_path, 'wb') as temp_file:
-                    temp_file.write(decrypted_data)
-                 
-                if progress_win.cancelled:
-                    return
-                 
-                # 解压ZIP文件
-                with zipfile.ZipFile(temp_zip_path, 'r') as zf:
-                    zf.extractall(extract_dir)
-                     
-            finally:
-                # 确保删除临时文件
-                try:
-                    os.unlink(temp_zip_path)
-                except OSError:
-                    pass  # 文件可能已经被删除
-             
-            progress_win.update_progress(100, "解密完成！")
-            progress_win.close()
-            self._show_success_message("成功", f"✅ 文件已解密并解压到: {extract_dir}")
-                 
-        except Exception as e:
-            progress_win.close()
-            self._show_error_message("错误", f"❌ 文件解密失败: {str(e)}")
+                with open(report_path, 'w', encoding='utf-8') as f:
+                    json.dump(records, f, ensure_ascii=False, indent=2)
+            except OSError as e:
+                self._show_error_message("错误", f"❌ 保存报告失败: {str(e)}")
+
+        btn_frame = tk.Frame(report_frame, bg=self.colors['bg_light'])
+        btn_frame.pack(pady=(15, 0))
+
+        btn_save = RoundedButton(btn_frame, text="💾 保存报告",
+                                 command=save_report,
+                                 bg_color=self.colors['primary'],
+                                 width=130, height=35)
+        btn_save.pack(side="left", padx=(0, 10))
+
+        btn_close = RoundedButton(btn_frame, text="关闭",
+                                  command=report_win.destroy,
+                                  bg_color=self.colors['secondary'],
+                                  width=100, height=35)
+        btn_close.pack(side="left")
 
-    def _select_file(self):
-        """选择文件"""
-        filename = filedialog.askopenfilename(
-            title="选择要加密/解密的文件",
-            filetypes=[("所有文件", "*.*")]
+    def _make_progress_callback(self, task, status):
+        """返回progress(已处理字节, 总字节)回调；task.update_bytes在用户取消时抛出OperationCancelled"""
+        def progress(done, total):
+            task.update_bytes(done, total, status)
+        return progress
+
+    def _browse_epkg_file(self):
+        """只解密成员索引，列出加密包内容"""
+        privkey_str = self._read_key_textbox(self.privkey_input)
+        if not privkey_str:
+            self._show_warning_message("警告", "⚠️ 请在解密栏中输入私钥")
+            return
+
+        epkg_path = filedialog.askopenfilename(
+            title="选择要查看的.epkg文件",
+            filetypes=[("加密包文件", "*.epkg"), ("所有文件", "*.*")]
         )
-        if filename:
-            self._show_success_message("成功", f"✅ 文件选择成功: {filename}")
-            self.selected_file_path = filename
-        else:
-            self._show_warning_message("警告", "⚠️ 未选择文件")
+        if not epkg_path:
+            return
+
+        def work(task):
+            task.update_status("读取成员索引...")
+            return open_package_index(epkg_path, privkey_str)
+
+        BackgroundTask(
+            self, "读取加密包内容...", work,
+            on_done=lambda result: self._show_package_contents_window(epkg_path, *result),
+            on_error=lambda e: self._show_error_message("错误", f"❌ 读取加密包内容失败: {str(e)}"),
+        ).start()
+
+    def _show_package_contents_window(self, epkg_path, header, aes_key, entries):
+        """显示加密包成员列表，支持提取选中的文件"""
+        contents_win = tk.Toplevel(self.root)
+        contents_win.title(f"加密包内容 - {os.path.basename(epkg_path)}")
+        contents_win.configure(bg=self.colors['bg_main'])
+        contents_win.transient(self.root)
+        contents_win.geometry("600x400")
+
+        try:
+            contents_win.iconbitmap('asset/icon.ico')
+        except tk.TclError:
+            pass
+
+        contents_frame = tk.Frame(contents_win, bg=self.colors['bg_light'], padx=20, pady=20)
+        contents_frame.pack(fill="both", expand=True, padx=20, pady=20)
+
+        total_size = sum(entry['size'] for entry in entries)
+        summary_label = ttk.Label(contents_frame,
+                                  text=f"共 {len(entries)} 个文件，{format_size(total_size)}（可按住Ctrl/Shift多选）",
+                                  style="Subtitle.TLabel")
+        summary_label.pack(anchor="w", pady=(0, 5))
+
+        listbox = tk.Listbox(contents_frame, selectmode=tk.EXTENDED,
+                             font=("Consolas", 10),
+                             bg=self.colors['bg_main'],
+                             fg=self.colors['text_light'],
+                             selectbackground=self.colors['primary'],
+                             relief="solid", borderwidth=1, highlightthickness=0)
+        listbox.pack(fill="both", expand=True)
+        for entry in entries:
+            listbox.insert(tk.END, f"{entry['name']}  ({format_size(entry['size'])})")
+
+        btn_frame = tk.Frame(contents_frame, bg=self.colors['bg_light'])
+        btn_frame.pack(pady=(15, 0))
+
+        def extract_selected():
+            selected = [entries[i] for i in listbox.curselection()]
+            if not selected:
+                self._show_warning_message("警告", "⚠️ 请先选择要提取的文件")
+                return
+            self._extract_selected_members(epkg_path, header, aes_key, selected)
+
+        btn_extract = RoundedButton(btn_frame, text="📤 提取选中",
+                                    command=extract_selected,
+                                    bg_color=self.colors['accent'],
+                                    width=140, height=35)
+        btn_extract.pack(side="left", padx=(0, 10))
+
+        btn_close = RoundedButton(btn_frame, text="关闭",
+                                  command=contents_win.destroy,
+                                  bg_color=self.colors['secondary'],
+                                  width=100, height=35)
+        btn_close.pack(side="left")
+
+    def _extract_selected_members(self, epkg_path, header, aes_key, selected):
+        """只解密选中成员所在的分段并提取"""
+        extract_dir = filedialog.askdirectory(title="选择解压目录")
+        if not extract_dir:
+            return
+
+        def work(task):
+            extract_package_members(epkg_path, header, aes_key, selected, extract_dir,
+                                    workers=self.crypto_workers,
+                                    progress=self._make_progress_callback(task, "解密并提取选中文件..."))
+
+        BackgroundTask(
+            self, "提取文件中...", work,
+            on_done=lambda _: self._show_success_message("成功", f"✅ 已提取 {len(selected)} 个文件到: {extract_dir}"),
+            on_error=lambda e: self._show_error_message("错误", f"❌ 提取失败: {str(e)}"),
+        ).start()
 
     def _encrypt_file(self):
-        """加密文件"""
-        if not hasattr(self, 'selected_file_path') or not self.selected_file_path:
+        """单文件加密：每个选中的文件分段加密为同目录下的<文件名>.enc，不打包不压缩"""
+        if not self.selected_files:
             self._show_warning_message("警告", "⚠️ 请先选择要加密的文件")
             return
 
-        if not self.pubkey_box.get(1.0, tk.END).strip():
-            self._show_warning_message("警告", "⚠️ 请先在公钥栏输入接收方公钥")
+        pubkeys = self._collect_recipients()
+        if not pubkeys:
+            self._show_warning_message("警告", "⚠️ 请在加密栏中输入至少一个接收方公钥")
             return
 
-        try:
-            with open(self.selected_file_path, 'rb') as f:
-                original_data = f.read()
+        files = list(self.selected_files)
 
-            pubkey_str = self.pubkey_box.get(1.0, tk.END).strip()
-            pubkey = RSA.import_key(pubkey_str)
-            cipher = PKCS1_OAEP.new(pubkey)
+        def work(task):
+            task.update_status("封装密钥...")
+            public_keys = [import_key(self._resolve_recipient(pubkey)) for pubkey in pubkeys]
+            outputs = []
+            for i, file_path in enumerate(files):
+                status = f"加密 {os.path.basename(file_path)} ({i + 1}/{len(files)})..."
+                outputs.append(encrypt_file(file_path, public_keys, workers=self.crypto_workers,
+                                            progress=self._make_progress_callback(task, status)))
+            return outputs
 
-            encrypted_data = cipher.encrypt(original_data)
-            encrypted_filename = self.selected_file_path + ".enc"
+        def on_done(outputs):
+            shown = "\n".join(outputs[:5]) + (f"\n等 {len(outputs)} 个文件" if len(outputs) > 5 else "")
+            self._show_success_message("成功", f"✅ 文件加密成功！\n加密文件:\n{shown}")
 
-            with open(encrypted_filename, 'wb') as f:
-                f.write(encrypted_data)
-
-            self._show_success_message("成功", f"✅ 文件加密成功！\n加密文件: {encrypted_filename}")
-            self.selected_file_path = encrypted_filename # 更新路径以便下次解密
-        except Exception as e:
-            self._show_error_message("错误", f"❌ 文件加密失败: {str(e)}")
+        BackgroundTask(
+            self, "文件加密中...", work, on_done=on_done,
+            on_error=lambda e: self._show_error_message("错误", f"❌ 文件加密失败: {str(e)}"),
+        ).start()
 
     def _decrypt_file(self):
-        """解密文件"""
-        if not hasattr(self, 'selected_file_path') or not self.selected_file_path:
-            self._show_warning_message("警告", "⚠️ 请先选择要解密的文件")
+        """解密单文件加密的.enc，输出到同目录并去掉.enc后缀"""
+        privkey_str = self._read_key_textbox(self.privkey_input)
+        if not privkey_str:
+            self._show_warning_message("警告", "⚠️ 请在解密栏中输入私钥")
             return
 
-        if not self.privkey_input.get(1.0, tk.END).strip():
-            self._show_warning_message("警告", "⚠️ 请先在私钥栏输入您的私钥")
+        enc_paths = filedialog.askopenfilenames(
+            title="选择要解密的.enc文件",
+            filetypes=[("加密文件", "*.enc"), ("所有文件", "*.*")]
+        )
+        if not enc_paths:
             return
 
-        try:
-            with open(self.selected_file_path, 'rb') as f:
-                encrypted_data = f.read()
+        def work(task):
+            privkeys = load_private_keys(privkey_str)
+            outputs = []
+            for i, enc_path in enumerate(enc_paths):
+                status = f"解密 {os.path.basename(enc_path)} ({i + 1}/{len(enc_paths)})..."
+                outputs.append(decrypt_file(enc_path, privkeys, workers=self.crypto_workers,
+                                            progress=self._make_progress_callback(task, status)))
+            return outputs
+
+        def on_done(outputs):
+            shown = "\n".join(outputs[:5]) + (f"\n等 {len(outputs)} 个文件" if len(outputs) > 5 else "")
+            self._show_success_message("成功", f"✅ 文件解密成功！\n解密文件:\n{shown}")
+
+        BackgroundTask(
+            self, "文件解密中...", work, on_done=on_done,
+            on_error=lambda e: self._show_error_message("错误", f"❌ 文件解密失败: {str(e)}"),
+        ).start()
+
+    def _encrypt_delta_directory(self):
+        """把目录自上次增量打包以来的变化加密为一个.epkg，第一次打包包含全部文件"""
+        pubkeys = self._collect_recipients()
+        if not pubkeys:
+            self._show_warning_message("警告", "⚠️ 请在加密栏中输入至少一个接收方公钥")
+            return
 
-            privkey_str = self.privkey_input.get(1.0, tk.END).strip()
-            privkey = RSA.import_key(privkey_str)
-            cipher = PKCS1_OAEP.new(privkey)
+        source_dir = filedialog.askdirectory(title="选择要增量打包的目录")
+        if not source_dir:
+            return
+        save_path = filedialog.asksaveasfilename(
+            title=f"保存增量包 ({len(pubkeys)} 个接收方)",
+            defaultextension=".epkg",
+            filetypes=[("加密包文件", "*.epkg"), ("所有文件", "*.*")]
+        )
+        if not save_path:
+            return
 
-            decrypted_data = cipher.decrypt(encrypted_data)
-            decrypted_filename = self.selected_file_path.replace(".enc", "")
+        codec = self.COMPRESSION_CHOICES[self.compression_codec.get()]
+        level = self.compression_level.get()
+
+        def work(task):
+            task.update_status("扫描目录变化...")
+            public_keys = [self._resolve_recipient(pubkey) for pubkey in pubkeys]
+            return encrypt_delta_package(source_dir, public_keys, save_path, codec=codec, level=level,
+                                         crypto_workers=self.crypto_workers,
+                                         compress_workers=self.compress_workers,
+                                         memory_budget=self.compress_memory_budget,
+                                         progress=self._make_progress_callback(task, "压缩并加密变化的文件..."))
+
+        def on_done(summary):
+            if summary['output'] is None:
+                self._show_success_message("提示", f"✅ 自第 {summary['generation']} 次同步以来目录没有变化，未生成增量包")
+                return
+            self._show_success_message(
+                "成功", f"✅ 第 {summary['generation']} 次同步的增量包已保存到: {summary['output']}\n"
+                        f"变化 {summary['changed']} 个，删除 {summary['deleted']} 个，未变 {summary['unchanged']} 个")
+
+        BackgroundTask(
+            self, "增量打包中...", work, on_done=on_done,
+            on_error=lambda e: self._show_error_message("错误", f"❌ 增量打包失败: {str(e)}"),
+        ).start()
+
+    def _apply_delta_packages(self):
+        """按文件名顺序把选中的增量包叠加到上一次的解压目录"""
+        privkey_str = self._read_key_textbox(self.privkey_input)
+        if not privkey_str:
+            self._show_warning_message("警告", "⚠️ 请在解密栏中输入私钥")
+            return
 
-            with open(decrypted_filename, 'wb') as f:
-                f.write(decrypted_data)
+        epkg_paths = sorted(filedialog.askopenfilenames(
+            title="选择增量包（按文件名顺序应用）",
+            filetypes=[("加密包文件", "*.epkg"), ("所有文件", "*.*")]
+        ))
+        if not epkg_paths:
+            return
+        extract_dir = filedialog.askdirectory(title="选择上一次的解压目录")
+        if not extract_dir:
+            return
 
-            self._show_success_message("成功", f"✅ 文件解密成功！\n解密文件: {decrypted_filename}")
-            self.selected_file_path = decrypted_filename # 更新路径以便下次加密
-        except Exception as e:
-            self._show_error_message("错误", f"❌ 文件解密失败: {str(e)}")
+        def work(task):
+            task.update_status("导入私钥...")
+            privkeys = load_private_keys(privkey_str)
+            info = None
+            for i, epkg_path in enumerate(epkg_paths):
+                status = f"应用 {os.path.basename(epkg_path)} ({i + 1}/{len(epkg_paths)})..."
+                info = apply_delta_package(epkg_path, privkeys, extract_dir, workers=self.crypto_workers,
+                                           progress=self._make_progress_callback(task, status))
+            return info
+
+        BackgroundTask(
+            self, "应用增量包中...", work,
+            on_done=lambda info: self._show_success_message(
+                "成功", f"✅ 已应用 {len(epkg_paths)} 个增量包，{extract_dir} 现为第 {info['generation']} 次同步"),
+            on_error=lambda e: self._show_error_message("错误", f"❌ 应用增量包失败: {str(e)}"),
+        ).start()
 
     def _build_guide_frame(self):
         """创建使用指南区域"""
@@ -1300,7 +1981,7 @@ A: 安全, 软件本身是开源且不需要联网的(这意味着所有人都
 非对称加密是一种端对端加密，理论上，除非您泄露私钥，否则您的聊天记录无法被任何人破译。
 不过，请注意其他可能窃取你聊天记录的方式(尤其是输入法)
 【技术】
-- 加密标准： RSA-2048 位非对称加密+PKCS1_OAEP。
+- 加密标准： RSA(PKCS1_OAEP) 或 ECC(P-256/P-384 ECDH + HKDF-SHA256) 封装随机密钥，正文使用 AES-256-GCM 加密，密钥类型按 PEM 自动识别。
 - 开源可信：本应用完全开源，所有代码均可被公开审查，以证明其不含任何后门。你也可以自行构建
 - 本地运行：所有密钥的生成、加密和解密过程，均在本地完成。
 【开源协议】
@@ -1346,9 +2027,12 @@ A: 安全, 软件本身是开源且不需要联网的(这意味着所有人都
         # 移除所有公钥输入框
         while len(self.pubkey_entries) > 0:
             entry_data = self.pubkey_entries.pop()
+            self._forget_key_textbox(entry_data['textbox'])
             entry_data['frame'].destroy()
         # 再重新添加一个
         self.add_pubkey_entry()
+        self.keyring_recipients = []
+        self._update_keyring_recipients_label()
         # 清空结果
         self._clear_encrypted_results()
 
@@ -1398,8 +2082,7 @@ A: 安全, 软件本身是开源且不需要联网的(这意味着所有人都
                     privkey_str = f.read()
                 
                 # 导入私钥并派生公钥
-                key = RSA.import_key(privkey_str)
-                pubkey_str = key.publickey().export_key().decode()
+                pubkey_str = public_key_from_private(privkey_str)
 
                 # 清空并填充
                 self.privkey_box.delete(1.0, tk.END)
@@ -1416,26 +2099,57 @@ A: 安全, 软件本身是开源且不需要联网的(这意味着所有人都
             except Exception as e:
                 self._show_error_message("错误", f"❌ 加载失败: {str(e)}")
 
-    def generate_keys(self):
-        """生成密钥对"""
+    def _append_private_keys(self):
+        """把私钥文件追加到解密栏的私钥输入框"""
+        filenames = filedialog.askopenfilenames(
+            title="选择私钥文件",
+            filetypes=[("PEM files", "*.pem"), ("All files", "*.*")]
+        )
+        if not filenames:
+            return
         try:
-            key = RSA.generate(2048)
-            private_key = key.export_key().decode()
-            public_key = key.publickey().export_key().decode()
+            blocks = []
+            for filename in filenames:
+                with open(filename, 'r') as f:
+                    blocks.extend(split_pem_blocks(f.read()))
+            load_private_keys(blocks)
+        except Exception as e:
+            self._show_error_message("错误", f"❌ 加载失败: {str(e)}")
+            return
+        existing = self.privkey_input.get(1.0, tk.END).strip()
+        self.privkey_input.delete(1.0, tk.END)
+        self.privkey_input.insert(tk.END, "\n".join(([existing] if existing else []) + blocks))
 
+    def generate_keys(self):
+        """生成密钥对；后台池中有现成的密钥对时立即填入"""
+        pool = self.keypair_pool
+        key_name = pool.curve or f"RSA-{pool.bits}"
+
+        def work(task):
+            task.update_status(f"生成{key_name}密钥对...")
+            return pool.take()
+
+        def on_done(result):
+            private_key, public_key = result
             self.pubkey_box.delete(1.0, tk.END)
             self.pubkey_box.insert(tk.END, public_key)
             self.privkey_box.delete(1.0, tk.END)
             self.privkey_box.insert(tk.END, private_key)
-            
+
             # 修复自动填充私钥功能
             if self.auto_fill_privkey.get():
                 self.privkey_input.delete(1.0, tk.END)
                 self.privkey_input.insert(tk.END, private_key)
-                
+
             self._show_success_message("成功", "密钥对生成成功！")
-        except Exception as e:
-            self._show_error_message("错误", f"❌ 密钥生成失败: {str(e)}")
+
+        if pool.ready():
+            on_done(pool.take())
+            return
+        BackgroundTask(
+            self, "生成密钥对...", work, on_done=on_done,
+            on_error=lambda e: self._show_error_message("错误", f"❌ 密钥生成失败: {str(e)}"),
+        ).start()
 
     def _clear_encrypted_results(self):
         """清空加密结果显示区域"""
@@ -1450,44 +2164,35 @@ A: 安全, 软件本身是开源且不需要联网的(这意味着所有人都
             self._show_warning_message("警告", "⚠️ 请输入要加密的消息")
             return
 
-        # 获取所有公钥
-        pubkeys = []
-        for entry_data in self.pubkey_entries:
-            pubkey_text = entry_data['textbox'].get(1.0, tk.END).strip()
-            if pubkey_text:
-                pubkeys.append(pubkey_text)
-
+        # 获取所有公钥（含密钥环中选中的接收方）
+        pubkeys = self._collect_recipients()
         if not pubkeys:
             self._show_warning_message("警告", "⚠️ 请至少输入一个公钥")
             return
 
-        # 清空之前的结果
-        self._clear_encrypted_results()
+        def work(task):
+            # 对每个公钥进行加密，结果为(内容, 是否出错)列表
+            results = []
+            for i, pubkey_str in enumerate(pubkeys):
+                task.update_progress(i * 100 / len(pubkeys), f"为接收方 {i + 1} 加密...")
+                try:
+                    results.append((encrypt_message(message, self._resolve_recipient(pubkey_str)), False))
+                except (ValueError, TypeError, IndexError):
+                    results.append(("❌ 公钥格式错误，请确保其为有效的 PEM 格式。", True))
+            return results
 
-        # 对每个公钥进行加密
-        for i, pubkey_str in enumerate(pubkeys):
-            try:
-                pubkey = RSA.import_key(pubkey_str)
-                cipher = PKCS1_OAEP.new(pubkey)
-                chunk_size = pubkey.size_in_bytes() - 42
-
-                chunks = [message.encode()[i:i + chunk_size] for i in range(0, len(message.encode()), chunk_size)]
-                encrypted_chunks = []
-                for chunk in chunks:
-                    encrypted = cipher.encrypt(chunk)
-                    encoded = base64.urlsafe_b64encode(encrypted).decode()
-                    encrypted_chunks.append(encoded)
-
-                result = "::".join(encrypted_chunks)
-                
-                # 创建结果显示框
-                self._create_encrypted_result_box(i + 1, result)
-                
-            except (ValueError, TypeError, IndexError) as e:
-                error_msg = "❌ 公钥格式错误，请确保其为有效的 PEM 格式。"
-                self._create_encrypted_result_box(i + 1, error_msg, is_error=True)
-            except Exception as e:
-                self._create_encrypted_result_box(i + 1, f"[❌ 未知错误] {str(e)}", is_error=True)
+        def on_done(results):
+            # 清空之前的结果
+            self._clear_encrypted_results()
+            # 创建结果显示框
+            for i, (content, is_error) in enumerate(results):
+                self._create_encrypted_result_box(i + 1, content, is_error=is_error)
+
+        def on_error(e):
+            self._clear_encrypted_results()
+            self._create_encrypted_result_box(1, f"[❌ 未知错误] {str(e)}", is_error=True)
+
+        BackgroundTask(self, "加密消息中...", work, on_done=on_done, on_error=on_error).start()
 
     def _create_encrypted_result_box(self, index, content, is_error=False):
         """创建加密结果显示框"""
@@ -1523,26 +2228,75 @@ A: 安全, 软件本身是开源且不需要联网的(这意味着所有人都
     def decrypt_message(self):
         """解密消息"""
         encrypted_text = self.msg_to_decrypt.get(1.0, tk.END).strip()
-        privkey_str = self.privkey_input.get(1.0, tk.END).strip()
+        privkey_str = self._read_key_textbox(self.privkey_input)
         if not encrypted_text or not privkey_str:
             self._show_warning_message("警告", "⚠️ 请输入加密消息和私钥")
             return
 
-        try:
-            privkey = RSA.import_key(privkey_str)
-            cipher = PKCS1_OAEP.new(privkey)
+        def work(task):
+            return decrypt_message(encrypted_text, privkey_str, workers=self.crypto_workers,
+                                   progress=lambda done, total: task.update_progress(
+                                       done * 100 / total if total else 0, "解密消息中..."))
 
-            encrypted_chunks = encrypted_text.split("::")
-            decrypted_bytes = b""
-            for enc_chunk in encrypted_chunks:
-                decoded = base64.urlsafe_b64decode(enc_chunk)
-                decrypted_bytes += cipher.decrypt(decoded)
-
-            decrypted = decrypted_bytes.decode()
+        def on_done(decrypted):
             self.decrypted_output.delete(1.0, tk.END)
             self.decrypted_output.insert(tk.END, decrypted)
             self._show_success_message("成功", "✅ 解密成功！")
-        except (ValueError, TypeError, IndexError) as e:
+
+        BackgroundTask(self, "解密消息中...", work, on_done=on_done,
+                       on_error=self._show_decrypt_message_error).start()
+
+    def decrypt_messages_batch(self):
+        """批量解密：每行一条加密消息，私钥只导入一次"""
+        encrypted_text = self.msg_to_decrypt.get(1.0, tk.END).strip()
+        privkey_str = self._read_key_textbox(self.privkey_input)
+        if not privkey_str:
+            self._show_warning_message("警告", "⚠️ 请在解密栏中输入私钥")
+            return
+
+        if not encrypted_text:
+            filename = filedialog.askopenfilename(
+                title="选择消息列表文件（每行一条加密消息）",
+                filetypes=[("文本文件", "*.txt"), ("所有文件", "*.*")]
+            )
+            if not filename:
+                return
+            try:
+                with open(filename, 'r', encoding='utf-8') as f:
+                    encrypted_text = f.read()
+            except Exception as e:
+                self._show_error_message("错误", f"❌ 读取失败: {str(e)}")
+                return
+
+        # 加密消息本身不含空白字符
+        tokens = encrypted_text.split()
+        if not tokens:
+            self._show_warning_message("警告", "⚠️ 没有找到加密消息")
+            return
+
+        def work(task):
+            return decrypt_messages(tokens, privkey_str, workers=self.crypto_workers,
+                                    progress=lambda done, total: task.update_progress(
+                                        done * 100 / total if total else 0, f"解密消息 {done}/{total}..."))
+
+        def on_done(results):
+            blocks = []
+            for i, (text, error) in enumerate(results):
+                blocks.append(f"【消息 {i + 1}】\n" + (text if error is None else f"❌ 解密失败: {str(error)}"))
+            failed = sum(1 for _, error in results if error is not None)
+            self.decrypted_output.delete(1.0, tk.END)
+            self.decrypted_output.insert(tk.END, "\n\n".join(blocks))
+            if failed:
+                self._show_warning_message("警告", f"⚠️ 共 {len(results)} 条消息，{failed} 条解密失败")
+            else:
+                self._show_success_message("成功", f"✅ {len(results)} 条消息全部解密成功！")
+
+        BackgroundTask(self, "批量解密消息中...", work, on_done=on_done,
+                       on_error=self._show_decrypt_message_error).start()
+
+    def _show_decrypt_message_error(self, e):
+        """按异常类型显示消息解密失败的原因"""
+        if isinstance(e, (ValueError, TypeError, IndexError)):
             error_msg = (
                 "❌ 解密失败，发生了值错误、类型错误或索引错误。\n\n"
                 "可能的原因：\n"
@@ -1552,7 +2306,7 @@ A: 安全, 软件本身是开源且不需要联网的(这意味着所有人都
                 f"详细信息: {str(e)}"
             )
             self._show_error_message("解密错误", error_msg)
-        except Exception as e:
+        else:
             self._show_error_message("未知错误", f"❌ 发生未知错误: {str(e)}")
     
     def _show_success_message(self, title, message):
@@ -1574,6 +2328,8 @@ if __name__ == "__main__":
         ctypes.windll.shcore.SetProcessDpiAwareness(1)
     except Exception:
         pass
+    # 打包为可执行文件后，压缩进程池需要此调用
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = AsymmetricChatApp(root)
     root.mainloop()